@@ -0,0 +1,201 @@
+import numpy as np
+from classes import *
+from physics import DirectSolver
+
+# number of times the root square can be divided into four
+MAX_DEPTH = 16
+
+
+def spreadBits(v):
+    """
+    Spreads the lower 16 bits of every value so that there is a zero bit between each of them
+    """
+    v = v.astype(np.uint64)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+
+def expandRanges(starts, counts):
+    """
+    Returns the index of the range each value belongs to and the values of all the given ranges one after another
+    """
+    owner = np.repeat(np.arange(len(starts)), counts)
+    # position of every value inside its own range
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, starts[owner] + offsets
+
+
+class QuadTree:
+    """
+    Quadtree over a set of bodies, built level by level from the bodies sorted along a Morton (Z-order) curve.
+    Every node covers a contiguous range [start, end) of the sorted bodies and stores their total mass and center of mass
+    """
+    def __init__(self, x, y, mass):
+        n = len(x)
+        # the root is the smallest square containing every body
+        self.x0 = x.min()
+        self.y0 = y.min()
+        self.size = max(x.max() - self.x0, y.max() - self.y0) * (1 + 1e-9)
+        if (self.size == 0):
+            self.size = 1.0
+        cells = 1 << MAX_DEPTH
+        ix = np.clip(((x - self.x0) / self.size * cells).astype(np.int64), 0, cells - 1)
+        iy = np.clip(((y - self.y0) / self.size * cells).astype(np.int64), 0, cells - 1)
+        code = spreadBits(ix) | (spreadBits(iy) << np.uint64(1))
+
+        # sort the bodies along the curve so every node is a contiguous range
+        self.order = np.argsort(code, kind="stable")
+        self.rank = np.empty(n, dtype=np.intp)
+        self.rank[self.order] = np.arange(n)
+        code = code[self.order]
+        self.x = x[self.order]
+        self.y = y[self.order]
+        self.mass = mass[self.order]
+        cum_mass = np.concatenate(([0.0], np.cumsum(self.mass)))
+        cum_mx = np.concatenate(([0.0], np.cumsum(self.mass * self.x)))
+        cum_my = np.concatenate(([0.0], np.cumsum(self.mass * self.y)))
+
+        starts = [np.array([0])]
+        ends = [np.array([n])]
+        levels = [np.array([0])]
+        first_child = []
+        child_count = []
+        # open every node holding more than one body until MAX_DEPTH is reached
+        level = 0
+        while (level < MAX_DEPTH):
+            parent_starts = starts[-1]
+            parent_ends = ends[-1]
+            internal = (parent_ends - parent_starts > 1)
+            if not internal.any():
+                break
+            # mark the bodies that lie inside an internal node
+            marks = np.zeros(n + 1, dtype=np.int64)
+            np.add.at(marks, parent_starts[internal], 1)
+            np.add.at(marks, parent_ends[internal], -1)
+            inside = np.cumsum(marks[:n]) > 0
+            # a child starts wherever the prefix of the code one level down changes
+            prefix = code >> np.uint64(2 * (MAX_DEPTH - level - 1))
+            boundary = np.concatenate(([True], prefix[1:] != prefix[:-1]))
+            all_starts = np.append(np.flatnonzero(boundary), n)
+            child_starts = np.flatnonzero(boundary & inside)
+            child_ends = all_starts[np.searchsorted(all_starts, child_starts, side="right")]
+            # ids of the children relative to the first node of the next level
+            offset = sum(len(s) for s in starts)
+            first = np.searchsorted(child_starts, parent_starts)
+            first_child.append(offset + first)
+            child_count.append(np.where(internal, np.searchsorted(child_starts, parent_ends) - first, 0))
+            starts.append(child_starts)
+            ends.append(child_ends)
+            levels.append(np.full(len(child_starts), level + 1))
+            level += 1
+        # the nodes of the last level have no children
+        first_child.append(np.zeros(len(starts[-1]), dtype=np.intp))
+        child_count.append(np.zeros(len(starts[-1]), dtype=np.intp))
+
+        self.start = np.concatenate(starts)
+        self.end = np.concatenate(ends)
+        self.level = np.concatenate(levels)
+        self.count = self.end - self.start
+        self.leaf = (self.count == 1) | (self.level == MAX_DEPTH)
+        self.first_child = np.concatenate(first_child)
+        self.child_count = np.concatenate(child_count)
+        self.node_mass = cum_mass[self.end] - cum_mass[self.start]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.comx = np.where(self.node_mass != 0, (cum_mx[self.end] - cum_mx[self.start]) / self.node_mass,
+                                 (self.x[self.start] + self.x[self.end - 1]) / 2)
+            self.comy = np.where(self.node_mass != 0, (cum_my[self.end] - cum_my[self.start]) / self.node_mass,
+                                 (self.y[self.start] + self.y[self.end - 1]) / 2)
+        self.node_size = self.size / (2.0 ** self.level)
+        # center of the square of every node, from the cell of its first body one level down at a time
+        shift = (MAX_DEPTH - self.level).astype(np.uint64)
+        cellx = (ix[self.order][self.start].astype(np.uint64) >> shift).astype(float)
+        celly = (iy[self.order][self.start].astype(np.uint64) >> shift).astype(float)
+        centerx = self.x0 + (cellx + 0.5) * self.node_size
+        centery = self.y0 + (celly + 0.5) * self.node_size
+        # how far the center of mass is off the center of the square
+        self.offset = np.hypot(self.comx - centerx, self.comy - centery)
+
+
+class BarnesHutSolver:
+    """
+    Approximates the accelerations with a Barnes-Hut quadtree. A node is used as a single body when its
+    center of mass is farther away than its width divided by the opening angle theta, plus how far the center
+    of mass is off the center of the node, so lopsided nodes are opened sooner. theta = 0 gives direct summation
+    """
+    def __init__(self, theta: float = 0.5):
+        self.theta = theta
+
+    def accelerations(self, x, y, mass, targets=None, softening: float = 0.0):
+        """
+        Returns the x and y components of the acceleration of the bodies at the indices in targets
+        (every body if targets is None), the tree is rebuilt on every call
+        """
+        if targets is None:
+            targets = np.arange(len(x))
+        accx = np.zeros(len(targets))
+        accy = np.zeros(len(targets))
+        if (len(targets) == 0):
+            return accx, accy
+        tree = QuadTree(x, y, mass)
+        # a node acts as one body for targets farther than its reach from its center of mass
+        with np.errstate(divide="ignore", invalid="ignore"):
+            reach = np.where(self.theta > 0, tree.node_size / self.theta, np.inf) + tree.offset
+
+        # every pair is (index into targets, node), start with the root for every target
+        target = np.arange(len(targets))
+        node = np.zeros(len(targets), dtype=np.intp)
+        body_x = x[targets]
+        body_y = y[targets]
+        body_rank = tree.rank[targets]
+        while (len(target)):
+            dx = tree.comx[node] - body_x[target]
+            dy = tree.comy[node] - body_y[target]
+            dist_sq = dx * dx + dy * dy
+            contains = (tree.start[node] <= body_rank[target]) & (body_rank[target] < tree.end[node])
+            # a node far enough away, or a single other body, acts as one point mass
+            far = ~contains & ((reach[node]**2 < dist_sq) | (tree.count[node] == 1))
+            self.addPointMasses(accx, accy, target[far], dx[far], dy[far], dist_sq[far] + softening**2, tree.node_mass[node[far]])
+
+            # the bodies of a leaf that could not be used as a whole are summed one by one
+            direct = ~far & tree.leaf[node] & (tree.count[node] > 1)
+            pair, body = expandRanges(tree.start[node[direct]], tree.count[node[direct]])
+            pair_target = target[direct][pair]
+            other = body != body_rank[pair_target]
+            pair_target = pair_target[other]
+            body = body[other]
+            dx = tree.x[body] - body_x[pair_target]
+            dy = tree.y[body] - body_y[pair_target]
+            self.addPointMasses(accx, accy, pair_target, dx, dy, dx * dx + dy * dy + softening**2, tree.mass[body])
+
+            # open the remaining nodes and continue with their children
+            opened = ~far & ~tree.leaf[node]
+            pair, node = expandRanges(tree.first_child[node[opened]], tree.child_count[node[opened]])
+            target = target[opened][pair]
+        return accx, accy
+
+    def addPointMasses(self, accx, accy, target, dx, dy, dist_sq, mass):
+        """
+        Adds the acceleration caused by point masses at distance (dx, dy) to the given targets
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = G * mass / (dist_sq * np.sqrt(dist_sq))
+            accx += np.bincount(target, weights=dx * scale, minlength=len(accx))
+            accy += np.bincount(target, weights=dy * scale, minlength=len(accy))
+
+    def findError(self, x, y, mass, targets=None, softening: float = 0.0):
+        """
+        Compares the accelerations against direct summation and returns the mean, root mean square and maximum
+        of the relative error of the magnitude of the difference
+        """
+        approx = self.accelerations(x, y, mass, targets, softening)
+        exact = DirectSolver().accelerations(x, y, mass, targets, softening)
+        diff = np.hypot(approx[0] - exact[0], approx[1] - exact[1])
+        norm = np.hypot(exact[0], exact[1])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            error = np.where(norm > 0, diff / norm, 0.0)
+        if (len(error) == 0):
+            return {"mean": 0.0, "rms": 0.0, "max": 0.0}
+        return {"mean": float(error.mean()), "rms": float(np.sqrt((error**2).mean())), "max": float(error.max())}
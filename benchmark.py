@@ -0,0 +1,119 @@
+"""
+Times Game.checkEvent, Game.update and Game.render on synthetic systems of growing size and writes the
+results as JSON so runs on different commits can be compared.
+
+    python benchmark.py --sizes 10 100 1000 --frames 50 --out bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+# render into memory, no window is opened
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import pygame
+from game_file import *
+
+PHASES = ("checkEvent", "update", "render")
+
+
+def syntheticSystem(game: Game, n: int, seed: int = 0):
+    """
+    Adds an attractor and n - 1 light planets on circular orbits around it to the game
+    """
+    rng = np.random.default_rng(seed)
+    center_mass = 400
+    game.addObject(Attractor(SCREEN[0] / 2, SCREEN[1] / 2, 20, mass=center_mass, color=YELLOW))
+    dist = rng.uniform(40, SCREEN[1] / 2, n - 1)
+    angle = rng.uniform(0, 2 * mth.pi, n - 1)
+    speed = np.sqrt(G * center_mass / dist)
+    for d, a, v in zip(dist.tolist(), angle.tolist(), speed.tolist()):
+        game.addObject(Planet(SCREEN[0] / 2 + d * mth.cos(a), SCREEN[1] / 2 + d * mth.sin(a), 2,
+                              velx=-v * mth.sin(a), vely=v * mth.cos(a), mass=0.01, color=BLUE))
+    # keep close passes between planets from flinging them far off the screen
+    game.engine.setIntegrator("leapfrog")
+    game.engine.softening = 1.0
+    # planets that touch would merge, and every frame would be timed with fewer bodies than the run is labelled with
+    game.useCollisions("ignore")
+
+
+def gitCommit():
+    """
+    Returns the hash of the checked out commit, or None outside of a git repository
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmarkSize(window, n: int, frames: int, budget: float, solver: str, theta: float):
+    """
+    Runs up to the given number of frames of a system with n bodies and returns the timings,
+    stops early once budget seconds were spent (but runs at least one frame)
+    """
+    game = Game(window)
+    start = time.perf_counter()
+    syntheticSystem(game, n)
+    game.addBasicButtons()
+    build_seconds = time.perf_counter() - start
+    game.engine.solver = makeSolver(solver, theta=theta)
+
+    times = {phase: [] for phase in PHASES}
+    run_start = time.perf_counter()
+    for frame in range(frames):
+        for phase in PHASES:
+            start = time.perf_counter()
+            getattr(game, phase)()
+            times[phase].append(time.perf_counter() - start)
+        if (time.perf_counter() - run_start > budget):
+            break
+    game.engine.close()
+
+    totals = np.sum([times[phase] for phase in PHASES], axis=0)
+    result = {"bodies": n, "final_bodies": len(game.objects), "build_seconds": build_seconds, "frames": len(totals),
+              "ms_per_frame": {}}
+    for phase in PHASES + ("total",):
+        samples = np.array(times[phase] if phase != "total" else totals) * 1000
+        result["ms_per_frame"][phase] = {"mean": float(samples.mean()), "median": float(np.median(samples)),
+                                         "p95": float(np.percentile(samples, 95)), "min": float(samples.min())}
+    result["steps_per_second"] = 1000 / result["ms_per_frame"]["update"]["mean"]
+    result["frames_per_second"] = 1000 / result["ms_per_frame"]["total"]["mean"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark physics, rendering and input handling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000], help="number of bodies of every run")
+    parser.add_argument("--frames", type=int, default=100, help="most frames timed for every size")
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds after which a size stops taking frames")
+    parser.add_argument("--solver", choices=SOLVERS, default="barnes-hut", help="how the accelerations are found")
+    parser.add_argument("--theta", type=float, default=0.5, help="opening angle of the barnes-hut solver")
+    parser.add_argument("--out", default="benchmark.json", help="file the results are written to")
+    args = parser.parse_args()
+
+    pygame.init()
+    window = pygame.display.set_mode(SCREEN)
+    results = []
+    print("%8s %10s %10s %10s %10s %10s" % ("bodies", "events ms", "update ms", "render ms", "frame ms", "steps/s"))
+    for n in args.sizes:
+        result = benchmarkSize(window, n, args.frames, args.budget, args.solver, args.theta)
+        ms = result["ms_per_frame"]
+        print("%8d %10.3f %10.3f %10.3f %10.3f %10.1f" % (n, ms["checkEvent"]["mean"], ms["update"]["mean"],
+                                                         ms["render"]["mean"], ms["total"]["mean"], result["steps_per_second"]))
+        results.append(result)
+    pygame.quit()
+
+    meta = {"commit": gitCommit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "pygame": pygame.version.ver, "numpy": np.__version__, "machine": platform.machine(),
+            "solver": args.solver, "theta": args.theta, "frames": args.frames, "budget": args.budget}
+    with open(args.out, "w") as file:
+        json.dump({"meta": meta, "results": results}, file, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,33 @@
 import pygame
 import math
+from functools import lru_cache
 from pygame.locals import *
 
 SCREEN = (1000, 600)
 BG = (0, 0, 0)
 
+# fonts by (name, size), SysFont searches for the font file every time it is called
+fonts = {}
+
+
+def getFont(name: str, size: int):
+    """
+    Returns the system font with the given name and size, loading it only the first time
+    """
+    font = fonts.get((name, size))
+    if (font is None):
+        font = pygame.font.SysFont(name, size)
+        fonts[(name, size)] = font
+    return font
+
+
+@lru_cache(maxsize=2048)
+def renderText(font_name: str, font_size: int, text: str, antialias: bool, color: tuple, background: tuple = None):
+    """
+    Returns the rendered text, surfaces are cached and shared so they must only be blitted, never drawn on
+    """
+    return getFont(font_name, font_size).render(text, antialias, color, background)
+
 class Button:
     """
     Acts as a super class for button types
@@ -44,6 +67,10 @@ class TextButton(Button):
         # font and font size of the text
         self.font = myfont
         self.font_size = font_size
+        # counts the changes to the look of the button, lets cached drawings know when to redraw it
+        self.version = 0
+        # indicates if the mouse is on the button
+        self.hovered = False
         # create the text
         self.updateText()
         # create the background rectangle
@@ -57,8 +84,9 @@ class TextButton(Button):
         """
         Updates the text with its data members
         """
-        self.myfont = pygame.font.SysFont(self.font, self.font_size)
-        self.mytext = self.myfont.render(" " + self.text + " ", False, self.textcolor, self.bgcolor)
+        self.myfont = getFont(self.font, self.font_size)
+        self.mytext = renderText(self.font, self.font_size, " " + self.text + " ", False, tuple(self.textcolor), tuple(self.bgcolor))
+        self.version += 1
 
     def updateRect(self):
         """
@@ -66,6 +94,7 @@ class TextButton(Button):
         """
         self.myrect = self.mytext.get_rect()
         self.myrect.topleft = (self.x, self.y)
+        self.version += 1
 
     def updateColor(self, color: tuple):
         """
@@ -83,6 +112,25 @@ class TextButton(Button):
         # update the text to apply the change
         self.updateText()
 
+    def setHover(self, hovered: bool):
+        """
+        Sets whether the mouse is on the button, the text is only rendered again when this changes
+        """
+        if (hovered == self.hovered):
+            return
+        self.hovered = hovered
+        # the button is darker while the mouse is on it
+        if (hovered):
+            self.updateColor(self.getHalfColor(self.default_bgcolor))
+        else:
+            self.updateColor(self.default_bgcolor)
+
+    def updateState(self):
+        """
+        Brings the look of the button up to date before it is drawn
+        """
+        pass
+
     def getHalfColor(self, color: tuple):
         """
         Returns a color with half the r,g, and b values
@@ -116,18 +164,53 @@ class InputBox(TextButton):
         # is_typing indicats if the user is typing on this button
         self.is_typing = False
 
+    def updateState(self):
+        """
+        Sets the color of the box from whether the user is typing on it
+        """
+        # if the user is typing on this box, set the color to half color regardless of where the mouse on the button
+        color = self.getHalfColor(self.default_bgcolor) if self.is_typing else self.default_bgcolor
+        if (color != self.bgcolor):
+            self.updateColor(color)
+
     def display(self, win):
         """
         Displays the input button on the window
         """
-        # if the user is typing on this box, set the color to half color regardless of where the mouse on the button
-        if (self.is_typing):
-            self.updateColor(self.getHalfColor(self.default_bgcolor))
-        else:
-            self.updateColor(self.default_bgcolor)
+        self.updateState()
         super().display(win)
     
 
+class UILayer:
+    """
+    Draws buttons onto one transparent surface that is kept until one of the buttons changes,
+    so drawing all of them usually costs a single blit
+    """
+    def __init__(self, size: tuple = SCREEN):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        # buttons and their versions when the surface was drawn
+        self.key = None
+        # area covered by the buttons
+        self.rect = None
+
+    def display(self, win, buttons: list):
+        """
+        Displays the given buttons, drawing them again only if they changed since the last call
+        """
+        for button in buttons:
+            button.updateState()
+        # the key holds the buttons themselves, an id could be given to a new button once an old one is gone
+        key = tuple((button, button.version) for button in buttons)
+        if (key != self.key):
+            self.surface.fill((0, 0, 0, 0))
+            for button in buttons:
+                button.display(self.surface)
+            self.key = key
+            self.rect = buttons[0].myrect.unionall([button.myrect for button in buttons[1:]]) if buttons else None
+        if (self.rect):
+            win.blit(self.surface, self.rect.topleft, self.rect)
+
+
 class InfoBox:
     """
     Infobox stores the properties of an object and takes any input to change the object's properties
@@ -385,7 +468,7 @@ class InfoBox:
         Displays the text and outline for the infoBox
         """
         pygame.draw.rect(win, (250, 250, 250), self.rect, 2)
-        win.blit((pygame.font.SysFont("calibri", 17)).render(" Color:", False, (255,100,100), BG), (SCREEN[0] - 195, 32))
-        win.blit((pygame.font.SysFont("calibri", 17)).render(" Mass:", True, (255,100,100), BG), (SCREEN[0] - 195, 52))
+        win.blit(renderText("calibri", 17, " Color:", False, (255,100,100), BG), (SCREEN[0] - 195, 32))
+        win.blit(renderText("calibri", 17, " Mass:", True, (255,100,100), BG), (SCREEN[0] - 195, 52))
         if (self.obj.getType() == "P"):
-            win.blit((pygame.font.SysFont("calibri", 12)).render(" Velocity:              @", True, (255,100,100)), (SCREEN[0] - 195, 75))
+            win.blit(renderText("calibri", 12, " Velocity:              @", True, (255,100,100)), (SCREEN[0] - 195, 75))
@@ -0,0 +1,91 @@
+"""
+Maps the world the bodies move in onto the window, so the view can be zoomed and panned.
+"""
+import numpy as np
+from button import SCREEN
+
+# how a body is drawn, picked from its radius on the screen
+PIXEL = 0
+FILLED = 1
+SMOOTH = 2
+# bodies smaller than PIXEL_RADIUS on the screen are one pixel, bodies from SMOOTH_RADIUS on are anti aliased
+PIXEL_RADIUS = 1
+SMOOTH_RADIUS = 3
+# factor the zoom changes by for every step of the mouse wheel
+ZOOM_STEP = 1.25
+
+
+def detailOf(screen_radius: float):
+    """
+    Returns how a body of the given radius on the screen is drawn: PIXEL, FILLED or SMOOTH
+    """
+    if (screen_radius < PIXEL_RADIUS):
+        return PIXEL
+    if (screen_radius < SMOOTH_RADIUS):
+        return FILLED
+    return SMOOTH
+
+
+class Camera:
+    """
+    Looks at the world point (x, y), which is shown at the center of the window, magnified by zoom.
+    The default camera shows the world exactly as the window pixels, so a scene looks the same as without one
+    """
+    def __init__(self, size: tuple = SCREEN, min_zoom: float = 1 / 64, max_zoom: float = 64):
+        self.size = size
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        # changes every time the view moves
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Goes back to the default view
+        """
+        self.x = self.size[0] / 2
+        self.y = self.size[1] / 2
+        self.zoom = 1.0
+        self.version += 1
+
+    def worldToScreen(self, x, y):
+        """
+        Returns the window position of the world position (x, y), works on numbers and arrays alike
+        """
+        return (x - self.x) * self.zoom + self.size[0] / 2, (y - self.y) * self.zoom + self.size[1] / 2
+
+    def screenToWorld(self, pos: tuple):
+        """
+        Returns the world position shown at the given window position
+        """
+        return ((pos[0] - self.size[0] / 2) / self.zoom + self.x, (pos[1] - self.size[1] / 2) / self.zoom + self.y)
+
+    def pan(self, dx: float, dy: float):
+        """
+        Moves the view so the world follows the mouse when it is dragged by (dx, dy) pixels
+        """
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self.version += 1
+
+    def zoomAt(self, pos: tuple, factor: float):
+        """
+        Multiplies the zoom by factor, keeping the world point under the window position pos in place
+        """
+        world = self.screenToWorld(pos)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        self.x = world[0] - (pos[0] - self.size[0] / 2) / self.zoom
+        self.y = world[1] - (pos[1] - self.size[1] / 2) / self.zoom
+        self.version += 1
+
+    def project(self, x, y, radius):
+        """
+        Returns the window positions and radii of the bodies at the world positions (x, y) with the given radii,
+        and which of them can be seen in the window
+        """
+        sx, sy = self.worldToScreen(x, y)
+        sr = radius * self.zoom
+        # a body is at least a pixel, even if it is smaller on the screen
+        margin = np.maximum(sr, 1)
+        visible = (sx + margin >= 0) & (sx - margin < self.size[0]) & (sy + margin >= 0) & (sy - margin < self.size[1])
+        return sx, sy, sr, visible
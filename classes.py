@@ -2,6 +2,7 @@ import pygame
 import math
 from draw import *
 from button import *
+from camera import detailOf, PIXEL, SMOOTH
 
 WHITE = (255,255,255)
 RED = (255,0,0)
@@ -17,6 +18,9 @@ class Object:
     """
     Super class for objects that appear on the screen
     """
+    # slots keep every body small, there can be many thousands of them
+    __slots__ = ("x", "y", "mass", "radius", "color", "glow", "show_stats", "obj_on_mouse", "_info_box", "handle")
+
     def __init__(self, x: int, y: int, radius: int, mass: float, color: tuple = HALFRED):
         # x,y coordinate of the center of the object
         self.x = x
@@ -27,6 +31,19 @@ class Object:
         self.glow = False
         self.show_stats = False
         self.obj_on_mouse = False
+        # the InfoBox is only built once the object is inspected
+        self._info_box = None
+        # handle given by the BodyRegistry the object is in, None when it is in none
+        self.handle = None
+
+    @property
+    def info_box(self):
+        """
+        Returns the InfoBox of the object, creating it the first time it is needed
+        """
+        if (self._info_box is None):
+            self._info_box = InfoBox(self)
+        return self._info_box
 
     def setPosition(self, pos: tuple):
         """
@@ -41,33 +58,30 @@ class Object:
         """
         self.mass = mass
 
-    def display(self, win):
-        """
-        Displays the object as a circle at the location (x,y)
-        """
-
-        pygame.gfxdraw.aacircle(win, int(self.x), int(self.y), self.radius, self.color)
-        pygame.gfxdraw.filled_circle(win, int(self.x), int(self.y), self.radius, self.color)
+    def display(self, win, camera: object = None):
+        """
+        Displays the object as a circle at the location (x,y), seen through the given Camera if there is one.
+        The object has to be in the window, the smaller it is on the screen the simpler it is drawn
+        """
+        x, y = camera.worldToScreen(self.x, self.y) if camera else (self.x, self.y)
+        x = int(x)
+        y = int(y)
+        radius = self.radius * camera.zoom if camera else self.radius
+        detail = detailOf(radius)
+        radius = int(radius)
+        if (detail == PIXEL):
+            win.set_at((x, y), self.color)
+        else:
+            if (detail == SMOOTH):
+                pygame.gfxdraw.aacircle(win, x, y, radius, self.color)
+            pygame.gfxdraw.filled_circle(win, x, y, radius, self.color)
         # if self.glow is true, draw a outline 
         if (self.glow):
-            pygame.gfxdraw.circle(win, int(self.x), int(self.y), self.radius, (255-self.color[0], 255-self.color[1], 255-self.color[2]))
+            pygame.gfxdraw.circle(win, x, y, max(radius, 1), (255-self.color[0], 255-self.color[1], 255-self.color[2]))
         # display info_box
         if (self.show_stats):
             self.info_box.display(win)
 
-    def findForce(self, obj: object):
-        """
-        Returns the force exerted by obj onto self
-        """
-        return (G * self.mass * obj.mass / (math.pow(obj.x - self.x, 2) + math.pow(obj.y - self.y, 2)))
-
-    def findUnitDist(self, obj: object):
-        """
-        return the unit vector <x, y> pointing in the direction of the given obj
-        """
-        dist = math.sqrt((obj.x - self.x)**2 + (obj.y - self.y)**2)
-        return (obj.x - self.x) / dist, (obj.y - self.y) / dist
-
     def mouseOnObj(self, pos: tuple):
         """
         Returns true if the given position is on the object, false otherwise
@@ -86,22 +100,10 @@ class Object:
         """ 
         return "O"
 
-    def update(self):
-        pass
-
-    def updateTrial(self):
-        pass
-
     def updateColor(self):
         self.color = self.info_box.getColor()
 
-    def resetTrial(self):
-        pass
-
-    def displayTrial(self, win):
-        pass
-
-    def drawVelocity(self, win):
+    def drawVelocity(self, win, camera: object = None):
         pass
 
 
@@ -109,9 +111,10 @@ class Attractor(Object):
     """
     An Attractor stays at rest and does not move but exerts force onto other objects
     """
+    __slots__ = ()
+
     def __init__(self, x: int, y: int, radius: int, mass: float = 200, color: tuple = HALFRED):
         super().__init__(x, y, radius, mass, color)
-        self.info_box = InfoBox(self)
 
     def getType(self):
         return "A"
@@ -121,6 +124,8 @@ class Planet(Object):
     """
     A Planet objects stores an object that can move
     """
+    __slots__ = ("velx", "vely", "accx", "accy")
+
     def __init__(self, x: int, y: int, radius: int, velx: float = 0, vely: float = 0, 
                 accx: float = 0, accy: float = 0, mass: float = 1, color: tuple = BLUE):
         super().__init__(x, y, radius, mass, color)
@@ -128,10 +133,6 @@ class Planet(Object):
         self.vely = vely
         self.accx = accx
         self.accy = accy
-        # trial is a list of a tuple containing the position and color of every past position of the planet
-        self.trial = []
-
-        self.info_box = InfoBox(self)
 
     def getType(self):
         return "P"
@@ -164,56 +165,10 @@ class Planet(Object):
             ang += 2*math.pi
         return math.degrees(ang)
 
-    def update(self):
-        """
-        updates the velocity and position
-        """
-        if (not self.obj_on_mouse):
-            self.velx += self.accx
-            self.vely += self.accy
-            self.x += self.velx
-            self.y += self.vely
-
-    def updateTrial(self):
-        """
-        Updates the trial of object
-        """
-        # insert the current position in the trial
-        self.trial.insert(0, [(int(self.x), int(self.y)), 160])
-        # remove the last trial if longer than 160
-        if (len(self.trial) >= 159):
-            self.trial.pop()
-        # decrease the color value by 1
-        for trl in self.trial:
-            trl[1] -=1
-
-    def resetTrial(self):
-        """
-        Resets the trial by emptying it
-        """
-        self.trial = []
-
-
-    def updateAcc(self, accx: float, accy: float):
-        """
-        Sets the acceleration to the given values
-        """
-        self.accx = accx
-        self.accy = accy
-
-    def drawVelocity(self, win):
+    def drawVelocity(self, win, camera: object = None):
         """
         Draws a arrow representing the velocity, proportional to velocity's magnitude
         """
         vel_mag = math.sqrt(self.velx**2 + self.vely**2)
-        drawArrow(win, self.x, self.y, vel_mag*10, (self.velx, self.vely))
-
-    def displayTrial(self, win):
-        """
-        Displays the trial of the planet
-        """
-        # for each instance, a line is drawn from previous to the next
-        # then, it's color is decreased by one
-        for i in range(len(self.trial) - 1):
-            color_temp = (self.trial[i][1], self.trial[i][1], self.trial[i][1])
-            pygame.draw.line(win, color_temp, self.trial[i][0], self.trial[i+1][0], 3)         
+        x, y = camera.worldToScreen(self.x, self.y) if camera else (self.x, self.y)
+        drawArrow(win, x, y, vel_mag*10, (self.velx, self.vely))
@@ -0,0 +1,363 @@
+from operator import attrgetter
+import numpy as np
+from registry import BodyRegistry
+
+COLLISION_MODES = ("merge", "bounce", "ignore")
+# exempt bodies are checked for being clear of the others once every this many steps, a second at 60 steps per second
+RELEASE_STEPS = 60
+
+
+def expandRanges(starts, counts):
+    """
+    Returns the index of the range and the value of every element of the ranges starts[k]:starts[k] + counts[k]
+    """
+    owner = np.repeat(np.arange(len(starts)), counts)
+    # offset of every element within its range
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, starts[owner] + offsets
+
+
+class StripIndex:
+    """
+    The given bodies cut into strips across the axis they are most spread on, as high as nearly every circle
+    is wide, and sorted by the left edge of their circle along that axis within every strip. A body can only
+    touch bodies of the strips its circle reaches, and only bodies whose intervals on the axis overlap its own
+    are tested exactly. The few bodies wider than a strip are kept apart, they are tested against the bodies
+    of every strip they reach and against each other
+    """
+    def __init__(self, x, y, radius, bodies):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.axis, self.across = (x, y) if np.ptp(x[bodies]) >= np.ptp(y[bodies]) else (y, x)
+        self.height = max(2 * np.percentile(radius[bodies], 99), 1.0)
+        self.wide = bodies[2 * radius[bodies] > self.height]
+        narrow = bodies[2 * radius[bodies] <= self.height]
+        strip = np.floor(self.across[narrow] / self.height)
+        low = (self.axis - radius)[narrow]
+        self.base = low.min()
+        self.end = (self.axis + radius)[narrow].max() - self.base
+        # the strips are laid one after another along the axis, span apart, so a single sorted array
+        # can be searched for the bodies of any strip
+        self.span = self.end + 2 * self.height + 1
+        # sorting by one key is much faster than by strip and position, it is only out of order when
+        # the bodies are spread so far apart that the key is not precise enough
+        sort = np.argsort((strip - strip.min()) * self.span + low - self.base)
+        self.sortBy(narrow, strip, low, sort)
+        if (np.any(self.numbers[1:] <= self.numbers[:-1]) or np.any(self.key[1:] < self.key[:-1])):
+            self.sortBy(narrow, strip, low, np.lexsort((low, strip)))
+
+    def sortBy(self, narrow, strip, low, sort):
+        """
+        Sorts the narrow bodies in the given order, where the strips are numbered 0, 1, 2... by rank
+        """
+        self.order = narrow[sort]
+        strip = strip[sort]
+        first = np.concatenate(([True], strip[1:] != strip[:-1]))
+        self.numbers = strip[first]
+        self.rank = np.cumsum(first) - 1
+        self.key = self.keyOf(low[sort], self.rank)
+
+    def keyOf(self, position, rank):
+        """
+        Returns the key of the given positions along the axis in the strips of the given ranks,
+        positions beyond every body are moved closer as they find the same bodies
+        """
+        return np.clip(position - self.base, -self.height, self.end + self.height) + rank * self.span
+
+    def reaching(self, bodies):
+        """
+        Returns the candidate pairs (i, j) of the given bodies and the narrow bodies of the strips they reach
+        """
+        axis = self.axis[bodies]
+        radius = self.radius[bodies]
+        reach = radius + self.height / 2
+        lowest = np.floor((self.across[bodies] - reach) / self.height)
+        owner, number = expandRanges(lowest, (np.floor((self.across[bodies] + reach) / self.height) - lowest + 1).astype(np.intp))
+        found = np.minimum(np.searchsorted(self.numbers, number), len(self.numbers) - 1)
+        present = self.numbers[found] == number
+        owner = owner[present]
+        found = found[present]
+        # a narrow body is at most height wide, so it starts at most height before the circle
+        start = np.searchsorted(self.key, self.keyOf(axis[owner] - radius[owner] - self.height, found), side="left")
+        end = np.searchsorted(self.key, self.keyOf(axis[owner] + radius[owner], found), side="right")
+        candidate, other = expandRanges(start, end - start)
+        return bodies[owner[candidate]], self.order[other]
+
+    def touchingOf(self, i, j):
+        """
+        Returns the pairs (i, j) whose circles overlap
+        """
+        touching = (self.x[j] - self.x[i])**2 + (self.y[j] - self.y[i])**2 <= (self.radius[i] + self.radius[j])**2
+        return i[touching], j[touching]
+
+    def pairs(self):
+        """
+        Returns the index pairs (i, j) of the bodies whose circles overlap, every pair once
+        """
+        order = self.order
+        rank = self.rank
+        high = (self.axis + self.radius)[order]
+        # bodies order[k + 1:end[k]] of the same strip start before body order[k] ends
+        end = np.searchsorted(self.key, self.keyOf(high, rank), side="right")
+        owner, other = expandRanges(np.arange(1, len(order) + 1), np.maximum(end - np.arange(len(order)) - 1, 0))
+        i = [order[owner]]
+        j = [order[other]]
+        # bodies of the next strip that start before body order[k] ends and are wide enough to reach it
+        has_next = np.concatenate((self.numbers[1:] == self.numbers[:-1] + 1, [False]))[rank]
+        start = np.searchsorted(self.key, self.keyOf(high - 2 * self.radius[order] - self.height, rank + 1), side="left")
+        end = np.searchsorted(self.key, self.keyOf(high, rank + 1), side="right")
+        owner, other = expandRanges(start, np.where(has_next, end - start, 0))
+        i.append(order[owner])
+        j.append(order[other])
+        if (len(self.wide)):
+            owner, other = self.reaching(self.wide)
+            first, second = np.triu_indices(len(self.wide), 1)
+            i += [owner, self.wide[first]]
+            j += [other, self.wide[second]]
+        return self.touchingOf(np.concatenate(i), np.concatenate(j))
+
+    def touching(self, bodies):
+        """
+        Returns whether the circle of each of the given bodies overlaps another body
+        """
+        found = np.zeros(len(self.x), dtype=bool)
+        i, j = self.touchingOf(*self.reaching(bodies))
+        # every narrow body finds itself
+        found[i[i != j]] = True
+        if (len(self.wide)):
+            first, second = np.triu_indices(len(self.wide), 1)
+            for i, j in (self.reaching(self.wide), (self.wide[first], self.wide[second])):
+                i, j = self.touchingOf(i, j)
+                found[i] = True
+                found[j] = True
+        return found[bodies]
+
+
+def sweepAndPrune(x, y, radius):
+    """
+    Returns the index pairs (i, j) of the bodies whose circles overlap, see StripIndex
+    """
+    # bodies whose position is not finite touch nothing
+    bodies = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+    if (len(bodies) < 2):
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return StripIndex(x, y, radius, bodies).pairs()
+
+
+def findGroups(n: int, i, j):
+    """
+    Returns the groups of bodies connected by the given pairs, bodies without a pair are left out
+    """
+    parent = list(range(n))
+
+    def root(k):
+        while (parent[k] != k):
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for a, b in zip(i.tolist(), j.tolist()):
+        ra = root(a)
+        rb = root(b)
+        if (ra != rb):
+            parent[rb] = ra
+    groups = {}
+    for k in set(i.tolist()) | set(j.tolist()):
+        groups.setdefault(root(k), []).append(k)
+    return list(groups.values())
+
+
+class CollisionHandler:
+    """
+    Finds the bodies that touch after a step and responds with the chosen mode:
+    "merge" joins them into one body keeping the total mass and momentum,
+    "bounce" reflects their velocities like elastic balls and "ignore" lets them pass through each other
+    """
+    def __init__(self, mode: str = "merge", restitution: float = 1.0):
+        self.setMode(mode)
+        # fraction of the approaching speed kept by a bounce, 1 is perfectly elastic
+        self.restitution = restitution
+        # radius, static, held and handle arrays of the bodies of a registry, and what the registry looked like then
+        self.arrays = None
+        self.key = None
+        # whether the body with every handle is exempt: it already overlapped others when its scene was built,
+        # so it passes through every body until it touches none and collides like any other body from then on
+        self.exempt = np.zeros(0, dtype=bool)
+        # counts the steps, a share of the exempt bodies is checked every step
+        self.steps = 0
+
+    def setMode(self, mode: str):
+        """
+        Sets how touching bodies respond
+        """
+        if mode not in COLLISION_MODES:
+            raise ValueError("unknown collision mode " + mode)
+        self.mode = mode
+
+    def exemptOverlaps(self, objects):
+        """
+        Lets the given objects that overlap others now pass through every body until they touch none,
+        so a scene built with bodies crowded together does not merge them all in its first steps
+        """
+        radius, static, held, handles = self.findArrays(objects)
+        x = np.fromiter(map(attrgetter("x"), objects), dtype=float, count=len(objects))
+        y = np.fromiter(map(attrgetter("y"), objects), dtype=float, count=len(objects))
+        i, j = sweepAndPrune(x, y, radius)
+        self.exempt = np.zeros(handles.max() + 1 if len(handles) else 0, dtype=bool)
+        self.exempt[handles[i]] = True
+        self.exempt[handles[j]] = True
+
+    def forgetOverlaps(self):
+        """
+        Lets every body collide again
+        """
+        self.exempt = np.zeros(0, dtype=bool)
+
+    def exemptOf(self, handles):
+        """
+        Returns whether each of the bodies with the given handles is exempt
+        """
+        exempt = np.zeros(len(handles), dtype=bool)
+        known = handles < len(self.exempt)
+        exempt[known] = self.exempt[handles[known]]
+        return exempt
+
+    def release(self, engine, radius, held, handles, exempt):
+        """
+        Checks a share of the exempt bodies and lets the ones that touch no body collide again
+        """
+        checked = np.flatnonzero(exempt & ~held & (handles % RELEASE_STEPS == self.steps % RELEASE_STEPS))
+        bodies = np.flatnonzero(~held & np.isfinite(engine.x) & np.isfinite(engine.y))
+        if (len(checked) == 0 or len(bodies) < 2):
+            return
+        clear = checked[~StripIndex(engine.x, engine.y, radius, bodies).touching(checked)]
+        if (len(clear)):
+            self.exempt[handles[clear]] = False
+            if (not self.exempt.any()):
+                self.forgetOverlaps()
+
+    def findArrays(self, objects):
+        """
+        Returns the radius of every body, which bodies are static and held and their handles (their indices
+        if they are not in a BodyRegistry), the arrays of a BodyRegistry are only built again after bodies
+        were added, removed, held or released
+        """
+        if (not isinstance(objects, BodyRegistry)):
+            return (np.array([obj.radius for obj in objects], dtype=float),
+                    np.array([obj.getType() != "P" for obj in objects], dtype=bool),
+                    np.array([obj.obj_on_mouse for obj in objects], dtype=bool),
+                    np.arange(len(objects), dtype=np.int64))
+        key = (objects, objects.version, objects.findArrays())
+        if (self.key is None or key[0] is not self.key[0] or key[1] != self.key[1] or key[2] is not self.key[2]):
+            static_indices, dynamic_indices, moving_indices = key[2]
+            radius = np.fromiter(map(attrgetter("radius"), objects), dtype=float, count=len(objects))
+            static = np.zeros(len(objects), dtype=bool)
+            static[static_indices] = True
+            held = np.zeros(len(objects), dtype=bool)
+            held[dynamic_indices] = True
+            held[moving_indices] = False
+            handles = np.fromiter(map(attrgetter("handle"), objects), dtype=np.int64, count=len(objects))
+            self.arrays = (radius, static, held, handles)
+            self.key = key
+        return self.arrays
+
+    def resolve(self, objects, engine):
+        """
+        Resolves the collisions between the given objects, whose state was just stepped by the engine,
+        and returns the objects that were merged into others and have to be removed.
+        Positions and velocities only change in the engine arrays, merged bodies get their new mass and radius
+        """
+        if (self.mode == "ignore" or len(objects) < 2):
+            return []
+        radius, static, held, handles = self.findArrays(objects)
+        removed, changed = self.resolveArrays(engine, radius, static, held, handles)
+        if (self.mode == "merge"):
+            # the other bodies of every group are removed, which builds the arrays again with the new radii
+            for k in changed.tolist():
+                objects[k].mass = float(engine.mass[k])
+                objects[k].radius = int(radius[k])
+        return [objects[k] for k in removed.tolist()]
+
+    def resolveArrays(self, engine, radius, static, held, handles):
+        """
+        Resolves the collisions between the bodies in the engine arrays, given the radius of every body,
+        which bodies are static (attractors) and held by the mouse and their handles. The arrays and radius
+        are changed in place. Returns the indices of the bodies that were merged into others and of the bodies
+        that changed
+        """
+        none = np.zeros(0, dtype=np.intp)
+        if (self.mode == "ignore" or len(radius) < 2):
+            return none, none
+        # bodies held by the mouse are moved by the user and take no part, nor do exempt bodies
+        taking_part = ~held
+        if (len(self.exempt)):
+            exempt = self.exemptOf(handles)
+            self.release(engine, radius, held, handles, exempt)
+            taking_part &= ~exempt
+        self.steps += 1
+        free = np.flatnonzero(taking_part)
+        i, j = sweepAndPrune(engine.x[free], engine.y[free], radius[free])
+        i = free[i]
+        j = free[j]
+        if (len(i) == 0):
+            return none, none
+        # the bodies are moved or merged, their accelerations are out of date
+        engine.changed()
+        if (self.mode == "bounce"):
+            return none, self.bounce(engine, radius, static, i, j)
+        return self.merge(engine, radius, static, i, j)
+
+    def merge(self, engine, radius, static, i, j):
+        """
+        Joins every group of touching bodies into its heaviest body, an attractor if the group has one.
+        The joined body has the total mass, the momentum and center of mass of the group and its total area
+        """
+        removed = []
+        kept = []
+        for group in findGroups(len(radius), i, j):
+            group = np.array(group, dtype=np.intp)
+            mass = engine.mass[group]
+            # attractors never move, so a group with one keeps it in place
+            candidates = np.flatnonzero(static[group]) if static[group].any() else np.arange(len(group))
+            keep = group[candidates[np.argmax(mass[candidates])]]
+            total = mass.sum()
+            if (not static[keep] and total > 0):
+                engine.x[keep] = engine.x[group].dot(mass) / total
+                engine.y[keep] = engine.y[group].dot(mass) / total
+                engine.velx[keep] = engine.velx[group].dot(mass) / total
+                engine.vely[keep] = engine.vely[group].dot(mass) / total
+            engine.mass[keep] = total
+            radius[keep] = max(round(np.sqrt(np.sum(radius[group]**2))), radius[keep])
+            removed += [k for k in group.tolist() if k != keep]
+            kept.append(keep)
+        return np.array(removed, dtype=np.intp), np.array(kept, dtype=np.intp)
+
+    def bounce(self, engine, radius, static, i, j):
+        """
+        Pushes every touching pair apart and reflects the part of their velocities along the line between them,
+        returns the indices of the bodies that moved
+        """
+        # attractors cannot be pushed, they act as if they had infinite mass
+        inv_mass = np.where(~static & (engine.mass > 0), 1 / np.where(engine.mass > 0, engine.mass, 1), 0.0)
+        w = inv_mass[i] + inv_mass[j]
+        moving = w > 0
+        i, j, w = i[moving], j[moving], w[moving]
+        dx = engine.x[j] - engine.x[i]
+        dy = engine.y[j] - engine.y[i]
+        dist = np.hypot(dx, dy)
+        # bodies on top of each other are pushed apart along x
+        nx = np.where(dist > 0, dx / np.where(dist > 0, dist, 1), 1.0)
+        ny = np.where(dist > 0, dy / np.where(dist > 0, dist, 1), 0.0)
+        # only pairs that are closing in get an impulse
+        closing = np.minimum((engine.velx[j] - engine.velx[i]) * nx + (engine.vely[j] - engine.vely[i]) * ny, 0)
+        impulse = -(1 + self.restitution) * closing / w
+        overlap = (radius[i] + radius[j] - dist) / w
+        for k, sign in ((i, -1), (j, 1)):
+            share = sign * inv_mass[k]
+            np.add.at(engine.velx, k, share * impulse * nx)
+            np.add.at(engine.vely, k, share * impulse * ny)
+            np.add.at(engine.x, k, share * overlap * nx)
+            np.add.at(engine.y, k, share * overlap * ny)
+        moved = np.unique(np.concatenate((i, j)))
+        return moved[~static[moved]]
@@ -1,9 +1,52 @@
+import os
 import time
+from operator import attrgetter
 from pygame.locals import *
 from classes import *
 from button import *
+from physics import *
+from trails import *
+from registry import BodyRegistry
+from collisions import CollisionHandler
+from snapshot import saveSnapshot, loadSnapshot, objectsFromArrays, arraysFromObjects
+from recorder import TrajectoryRecorder, TrajectoryReader
+from worker import PhysicsWorker
+from profiler import FrameProfiler, ProfilerHUD
+from generators import GENERATORS
+from camera import Camera, ZOOM_STEP, PIXEL_RADIUS, SMOOTH_RADIUS
+from points import PointRenderer
+from spatial import SpatialHash
+from barnes_hut import *
+from parallel import ParallelSolver
+from particle_mesh import ParticleMeshSolver
 import math as mth
 
+# screens that only change when the user does something, they wait for events instead of drawing all the time
+IDLE_STATES = ("menu", "templates", "edit", "velocity", "preview")
+# longest wait for an event on those screens in milliseconds
+IDLE_TIMEOUT = 500
+# seconds a system is shown before it starts moving
+PREVIEW_SECONDS = 2
+# mouse buttons that move the camera instead of clicking, the right button pans and 4 and 5 are the wheel
+PAN_BUTTON = 3
+CAMERA_BUTTONS = (3, 4, 5)
+# names of the solvers the accelerations can be found with
+SOLVERS = ("direct", "barnes-hut", "parallel", "particle-mesh")
+
+
+def makeSolver(name: str, theta: float = 0.5, workers: int = None, grid: tuple = (256, 160)):
+    """
+    Returns the solver with the given name
+    """
+    if (name == "barnes-hut"):
+        return BarnesHutSolver(theta)
+    elif (name == "parallel"):
+        return ParallelSolver(workers)
+    elif (name == "particle-mesh"):
+        return ParticleMeshSolver(grid)
+    return DirectSolver()
+
+
 class Game:
     """
     Contains the game loop 
@@ -12,11 +55,19 @@ class Game:
         # window to display on
         self.window = window
         # stores all the objects on the screen
-        self.objects = []
+        self.objects = BodyRegistry()
         # stores all the buttons on the screen
         self.buttons = []
         # boolean indicating whether trial should be shown
         self.show_trial = True
+        # the part of the world shown in the window, the mouse wheel zooms and dragging with the right button pans
+        self.camera = Camera(SCREEN)
+        self.panning = False
+        # draws the bodies that are only a few pixels wide all at once, G turns on their additive glow
+        self.point_renderer = PointRenderer()
+        # "buffer" keeps the past positions of every planet, "fade" draws onto a layer that fades out
+        self.trail_mode = "buffer"
+        self.setTrailMode(self.trail_mode)
         self.running = True
         # indicates whether velocity arrow should be drawn
         self.draw_velocity = True
@@ -34,14 +85,64 @@ class Game:
         self.menu_choice = -1
         # indicates if the user is relocating an object
         self.relocating = False
+        # moves the objects every step, its solver can be swapped (e.g. for a BarnesHutSolver) for large systems
+        self.engine = Engine()
+        # name of the solver the engine has, and of the solver the user chose for every scene (None to let
+        # every scene choose its own)
+        self.engine_solver = "direct"
+        self.solver_name = None
+        # finds the bodies that touch after every step and merges or bounces them,
+        # collision_mode is the mode the user chose for every scene (None to let every scene choose its own)
+        self.collision_mode = None
+        self.collisions = CollisionHandler()
+        # file the scene is saved to and loaded from
+        self.scene_path = "scene.npz"
+        # number of bodies and seed of the scenes built by the generators on the template screen
+        self.generated_bodies = 2000
+        self.seed = 0
+        # writes every step to a file while recording, None otherwise
+        self.recorder = None
+        # times the sections of every frame, F3 shows the times
+        self.profiler = FrameProfiler()
+        self.engine.profiler = self.profiler
+        self.show_profiler = False
+        self.profiler_hud = None
+        # file the times are written to when the game ends, None to not write them
+        self.profile_path = None
+        # screen the game is on, see setState
+        self.state = None
+        self.clock = pygame.time.Clock()
+        # when True, run steps the physics on a PhysicsWorker thread and draws the bodies between its snapshots
+        self.async_physics = False
+        self.worker = None
+        # frames of a recording shown per physics step while replaying it, and seconds to jump by
+        self.replay_speed = 1.0
+        self.replay_seek = 0.0
+        # number of physics steps per second of real time, independent of the frame rate
+        self.physics_rate = 60
+        # system cursor currently shown
+        self.cursor = None
+        # grid of the objects used to find the one under the mouse, rebuilt when it is stale
+        self.pick_grid = SpatialHash()
+        self.pick_grid_stale = True
+        # object and button the mouse is on
+        self.hovered_obj = None
+        self.hovered_button = None
+        # the buttons drawn onto one cached surface
+        self.ui_layer = UILayer(SCREEN)
+        # when True, only the parts of the window that changed are presented and unchanged frames are skipped
+        self.dirty_rendering = False
+        # what was drawn in the last frame, None when the whole window has to be presented
+        self.drawn_items = None
 
     def reset(self):
         """
         Clears objects and buttons, and resets all values to default
         """
-        self.objects = []
+        self.objects = BodyRegistry()
         self.buttons = []
         self.show_trial = True
+        self.setTrailMode(self.trail_mode)
         self.running = True
         self.draw_velocity = True
         self.paused = False
@@ -50,13 +151,109 @@ class Game:
         self.obj_on_mouse = None
         self.showing_stat_of = None
         self.relocating = False
+        self.pick_grid_stale = True
+        self.hovered_obj = None
+        self.hovered_button = None
+        self.camera.reset()
+        self.panning = False
+        self.engine.setIntegrator("euler")
+        self.engine.softening = 0.0
+        self.useSolver("direct")
+        self.useCollisions("merge")
+        self.collisions.forgetOverlaps()
+
+
+    def useSolver(self, name: str):
+        """
+        Finds the accelerations with the solver of the given name from now on, unless the user chose a solver
+        """
+        name = self.solver_name if self.solver_name else name
+        if (name != self.engine_solver):
+            # the old solver may hold on to worker processes
+            self.engine.close()
+            self.engine.solver = makeSolver(name)
+            self.engine_solver = name
+
+    def useCollisions(self, mode: str):
+        """
+        Makes touching bodies respond with the given mode from now on, unless the user chose a mode
+        """
+        self.collisions.setMode(self.collision_mode if self.collision_mode else mode)
 
+    def setTrailMode(self, mode: str):
+        """
+        Switches between storing trails in a ring buffer ("buffer") and drawing them onto a fading layer ("fade")
+        """
+        self.trail_mode = mode
+        if (mode == "fade"):
+            self.trails = FadingTrailLayer(SCREEN, camera=self.camera)
+        else:
+            self.trails = TrailBuffer()
 
     def addObject(self, obj: Object):
         """
-        Adds the given object to the object list
+        Adds the given object to the object registry
+        """
+        # the objects need the state of the arrays before the indices change
+        self.engine.sync()
+        self.objects.add(obj)
+        self.pick_grid_stale = True
+
+    def removeObject(self, obj: Object):
+        """
+        Removes the given object from the object registry
+        """
+        self.removeObjects([obj])
+
+    def removeObjects(self, objects: list):
+        """
+        Removes the given objects from the object registry at once
+        """
+        if (self.showing_stat_of in objects):
+            self.doButtonAction(499)
+        self.engine.remove(self.objects, objects)
+        for obj in objects:
+            self.trails.remove(obj)
+        self.pick_grid_stale = True
+        if (self.hovered_obj in objects):
+            self.hovered_obj = None
+
+    def saveScene(self, path: str = None):
+        """
+        Saves every body and the integrator settings to path (scene_path by default)
         """
-        self.objects.append(obj)
+        engine = self.engine
+        saveSnapshot(path if path else self.scene_path, self.objects,
+                     {"integrator": engine.integrator, "dt": engine.dt, "substeps": engine.substeps,
+                      "softening": engine.softening, "collisions": self.collisions.mode})
+
+    def loadScene(self, path: str = None):
+        """
+        Replaces every body with the ones saved at path (scene_path by default) and uses the saved settings
+        """
+        objects, settings = loadSnapshot(path if path else self.scene_path)
+        if (self.showing_stat_of):
+            self.doButtonAction(499)
+        self.objects = BodyRegistry()
+        self.objects.extend(objects)
+        self.collisions.forgetOverlaps()
+        self.setTrailMode(self.trail_mode)
+        self.obj_on_mouse = None
+        self.relocating = False
+        self.hovered_obj = None
+        self.pick_grid_stale = True
+        engine = self.engine
+        settings = (settings.get("integrator", engine.integrator), settings.get("dt", engine.dt), settings.get("substeps", engine.substeps),
+                    settings.get("softening", engine.softening),
+                    self.collision_mode if self.collision_mode else settings.get("collisions", self.collisions.mode))
+        if (self.worker):
+            # the worker owns the engine while it runs
+            self.worker.send("settings", *settings)
+            self.sendBodies()
+        else:
+            engine.setIntegrator(settings[0], dt=settings[1], substeps=settings[2])
+            engine.softening = settings[3]
+            self.collisions.setMode(settings[4])
 
     def addButton(self, button: Button):
         """
@@ -68,36 +265,29 @@ class Game:
         """
         Updates the positions of the objects 
         """
-        # iterate through every object in self.objects
-        for i in range(len(self.objects)):
-            # ingore attractor since their position does not change
-            if type(self.objects[i]) == Attractor:
-                continue
-            temp_accx = 0
-            temp_accy = 0
-            # for every other object, calculate the force exerted onto the current object
-            for j in range(len(self.objects)):
-                if (i != j):
-                    # get the magnitude of the force
-                    force = self.objects[i].findForce(self.objects[j])
-                    # get the direction of the force
-                    unit_direction = self.objects[i].findUnitDist(self.objects[j])
-                    # add the components to their respective variables
-                    temp_accx += unit_direction[0] * force / self.objects[i].mass
-                    temp_accy += unit_direction[1] * force / self.objects[i].mass
-            # update the object's acceleration
-            self.objects[i].updateAcc(temp_accx, temp_accy)
-
-        for obj in self.objects:
-            # use the object's update function to update velocity and position
-            obj.update()
-            obj.info_box.update()
-            # update trial if show_trial is true, empty the trial otherwise
-            if (self.show_trial):
-                obj.updateTrial()
-            else:
-                obj.resetTrial()
-            
+        profiler = self.profiler
+        # find the accelerations and move every body in one batched step
+        profiler.begin("update.integrate")
+        self.engine.step(self.objects)
+        profiler.end("update.integrate")
+        self.pick_grid_stale = True
+        # touching bodies merge or bounce, the engine removes merged bodies from its arrays with the objects
+        profiler.begin("update.collisions")
+        removed = self.collisions.resolve(self.objects, self.engine)
+        if (removed):
+            self.removeObjects(removed)
+        profiler.end("update.collisions")
+        profiler.begin("update.trails")
+        # update trial if show_trial is true, empty the trial otherwise
+        if (self.show_trial):
+            planets = self.objects.dynamicIndices()
+            self.trails.push([self.objects[i] for i in planets.tolist()], self.engine.x[planets], self.engine.y[planets])
+        else:
+            self.trails.clear()
+        profiler.end("update.trails")
+        if (self.recorder):
+            self.recorder.record(self.objects, self.engine)
+
     def renderCenterOfMass(self):
         """
         Displays the center of mass of the system as a circle
@@ -109,10 +299,9 @@ class Game:
         x_total = 0.0
         y_total = 0.0
         mass_total = 0.0
-        for obj in self.objects:
-            # ignore attractors
-            if type(obj) == Attractor:
-                continue
+        # ignore attractors
+        for i in self.objects.dynamicIndices().tolist():
+            obj = self.objects[i]
             x_total += obj.x * obj.mass
             y_total += obj.y * obj.mass
             mass_total += obj.mass
@@ -121,33 +310,133 @@ class Game:
         y_cm = int(y_total / mass_total)
 
         # draw the center of mass
-        pygame.draw.circle(self.window, BLUE, (x_cm, y_cm), 5)
+        pygame.draw.circle(self.window, BLUE, toInt(self.camera.worldToScreen(x_cm, y_cm)), 5)
+
+    def findVisible(self):
+        """
+        Returns the window positions and radii of the objects and which of them the camera sees
+        """
+        objects = self.objects
+        n = len(objects)
+        x, y, radius = [np.fromiter(map(attrgetter(name), objects), float, n) for name in ("x", "y", "radius")]
+        return self.camera.project(x, y, radius)
+
+    def findDrawnItems(self, visible: tuple):
+        """
+        Returns a set of (rect, state) pairs of everything render draws, equal sets mean identical frames.
+        visible is what findVisible returned for the frame
+        """
+        items = set()
+        if (self.show_trial):
+            items.update((rect, ("trail", self.trails.version)) for rect in self.trails.findRects(self.camera))
+        sx, sy, sr, shown = visible
+        indices = np.flatnonzero(shown)
+        objects = [self.objects[i] for i in indices.tolist()]
+        positions = zip(sx[indices].tolist(), sy[indices].tolist(), sr[indices].tolist())
+        if (self.obj_on_mouse):
+            objects.append(self.obj_on_mouse)
+            x, y = self.camera.worldToScreen(self.obj_on_mouse.x, self.obj_on_mouse.y)
+            positions = list(positions) + [(x, y, self.obj_on_mouse.radius * self.camera.zoom)]
+        for obj, (x, y, r) in zip(objects, positions):
+            x = int(x)
+            y = int(y)
+            r = int(r) + 1
+            items.add(((x - r, y - r, 2 * r + 1, 2 * r + 1), ("body", obj.color, obj.glow)))
+            if (self.draw_velocity and obj.getType() == "P"):
+                # the arrow fits in a square around the body however it points
+                length = int(mth.sqrt(obj.velx**2 + obj.vely**2) * 10) + 4
+                items.add(((x - length, y - length, 2 * length + 1, 2 * length + 1), ("arrow", obj.velx, obj.vely)))
+            if (obj.show_stats):
+                items.add((tuple(obj.info_box.rect), ("info", obj.getType())))
+        if (self.showing_stat_of):
+            # the InfoBox is drawn even when its object is out of view
+            items.add((tuple(self.showing_stat_of.info_box.rect), ("info", self.showing_stat_of.getType())))
+        for button in self.buttons:
+            items.add((tuple(button.myrect), ("button", button.text, button.bgcolor, button.textcolor, getattr(button, "is_typing", False))))
+        if (self.show_profiler):
+            items.update((tuple(button.myrect), ("hud", button.text)) for button in self.profiler_hud.buttons)
+        return items
+
+    def present(self):
+        """
+        Presents the frame, only the changed parts of it when dirty_rendering is on
+        """
+        if (not self.dirty_rendering or self.drawn_items is None):
+            pygame.display.update()
+        else:
+            # everything that appeared, moved, changed or disappeared since the last frame
+            changed = self.drawn_items.symmetric_difference(self.frame_items)
+            pygame.display.update([pygame.Rect(rect) for rect, state in changed])
+        self.drawn_items = self.frame_items if self.dirty_rendering else None
 
     def render(self):
         """
         Displays the objects and buttons
         """
+        profiler = self.profiler
+        profiler.begin("render.bodies")
+        # the objects only get the state of the physics arrays when they are drawn
+        self.engine.sync()
+        # only the InfoBox on the screen needs to follow the object
+        if (self.showing_stat_of):
+            self.showing_stat_of.info_box.update()
+        # only the objects in view are drawn
+        visible = self.findVisible()
+        shown = np.flatnonzero(visible[3]).tolist()
+        profiler.end("render.bodies")
+        if (self.dirty_rendering):
+            self.frame_items = self.findDrawnItems(visible)
+            # nothing changed since the last frame, skip drawing and presenting it
+            if (self.frame_items == self.drawn_items):
+                return
+        camera = self.camera
         # fill the background
+        profiler.begin("render.trails")
         self.window.fill(BLACK)
         # display the trial
         if (self.show_trial):
-            for obj in self.objects:
-                obj.displayTrial(self.window)
+            self.trails.display(self.window, camera)
+        profiler.end("render.trails")
 
         # display the object
-        for obj in self.objects:
-            obj.display(self.window)
+        profiler.begin("render.bodies")
+        objects = self.objects
+        sx, sy, sr, in_view = visible
+        # small bodies are drawn in one batch, the hovered and selected ones are drawn by themselves to show them
+        batch = in_view & (sr < SMOOTH_RADIUS)
+        for obj in (self.hovered_obj, self.showing_stat_of):
+            if (obj and obj in objects):
+                batch[objects.indexOf(obj)] = False
+        if (batch.any()):
+            colors = self.point_renderer.colorsOf(objects)
+            radius = np.where(sr[batch] < PIXEL_RADIUS, 0, sr[batch]).astype(np.intp)
+            if (not self.point_renderer.draw(self.window, sx[batch].astype(np.intp), sy[batch].astype(np.intp), radius, colors[batch])):
+                batch[:] = False
+        for i in np.flatnonzero(in_view & ~batch).tolist():
+            objects[i].display(self.window, camera)
+        # the InfoBox of an object out of view is still shown
+        selected = self.showing_stat_of
+        if (selected and selected in objects and not visible[3][objects.indexOf(selected)]):
+            selected.info_box.display(self.window)
+        profiler.end("render.bodies")
         # draw the velocity arrow if the toggle is on
+        profiler.begin("render.arrows")
         if (self.draw_velocity):
-            for obj in self.objects:
-                obj.drawVelocity(self.window)
+            for i in shown:
+                objects[i].drawVelocity(self.window, camera)
+        profiler.end("render.arrows")
         # draw the button on the screen
-        for button in self.buttons:
-            button.display(self.window)
+        profiler.begin("render.buttons")
+        self.ui_layer.display(self.window, self.buttons)
+        if (self.show_profiler):
+            self.profiler_hud.display(self.window)
+        profiler.end("render.buttons")
 
         # renders object on mouse when the user is creating custom system
         self.renderObjOnMouse()
-        pygame.display.update()
+        profiler.begin("render.present")
+        self.present()
+        profiler.end("render.present")
 
     def addBasicButtons(self):
         """
@@ -169,6 +458,9 @@ class Game:
         self.addObject(Planet(400, 500, 7, velx = vel_temp, color = BLUE, mass=mass_planet))
         vel_temp_moon = vel_temp + mth.sqrt(G * mass_planet / (515 - 500))
         self.addObject(Planet(400, 515, 3, velx = vel_temp_moon, color = GREEN, mass = 0.1))
+        # only the moon needs small steps to stay in orbit, the block integrator gives them to it alone
+        self.engine.setIntegrator("block")
+        self.engine.softening = 0.5
 
     def binarySun(self):
         """
@@ -178,6 +470,24 @@ class Game:
         self.addObject(Planet(350, 280, 10, vely=1.4, color = BLUE, mass = 200))
         self.addObject(Planet(400, 300, 10, vely=-1.4, color = YELLOW, mass=200))
         self.addObject(Planet(400, 450, 6, velx = 2.4, color = GREEN, mass = 1))
+        self.engine.setIntegrator("leapfrog", substeps=2)
+        # the suns overlap on their closest passes and would merge
+        self.useCollisions("ignore")
+
+    def generateScene(self, generator, n: int = None, seed: int = None):
+        """
+        Adds the bodies built by the given function of generators.py, with n bodies (generated_bodies by default)
+        """
+        arrays = generator(n if n else self.generated_bodies, self.seed if seed is None else seed)
+        self.addBasicButtons()
+        self.objects.extend(objectsFromArrays(arrays))
+        # the bodies are placed at random and some start out touching, they only collide once they are clear
+        self.collisions.exemptOverlaps(self.objects)
+        self.pick_grid_stale = True
+        self.engine.setIntegrator("leapfrog")
+        self.engine.softening = 2.0
+        # direct summation is far too slow for thousands of bodies, the mesh keeps them interactive
+        self.useSolver("particle-mesh")
 
     def doButtonAction(self, num: int):
         """
@@ -200,15 +510,15 @@ class Game:
                 self.relocating = False
                 if (self.showing_stat_of):
                     self.doButtonAction(499)
-                if (self.objects.count(self.obj_on_mouse) != 0):
-                    self.objects.remove(self.obj_on_mouse)
+                if (self.obj_on_mouse in self.objects):
+                    self.removeObject(self.obj_on_mouse)
                 self.obj_on_mouse = None
             elif (num == 301):
-                self.obj_on_mouse = Attractor(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1], 10, mass=400)
+                self.obj_on_mouse = Attractor(*self.camera.screenToWorld(pygame.mouse.get_pos()), 10, mass=400)
             elif (num == 302):
-                self.obj_on_mouse = Planet(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1], 10, mass=400)
+                self.obj_on_mouse = Planet(*self.camera.screenToWorld(pygame.mouse.get_pos()), 10, mass=400)
             elif (num == 303):
-                self.obj_on_mouse = Planet(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1], 7, mass=10)
+                self.obj_on_mouse = Planet(*self.camera.screenToWorld(pygame.mouse.get_pos()), 7, mass=10)
         elif (400 <= num < 500): # this range is for buttons and input boxes on an object's InfoBox
             if (num == 499): # 499 is the closing the stats button
                 self.showing_stat_of.show_stats = False
@@ -219,24 +529,49 @@ class Game:
                 self.is_typing = True
                 self.pressedButton.is_typing = True
 
-    def checkEvent(self):
+    def setCursor(self, cursor: int):
+        """
+        Changes the system cursor if it is not already the given one
+        """
+        if (cursor == self.cursor):
+            return
+        self.cursor = cursor
+        try:
+            pygame.mouse.set_system_cursor(cursor)
+        except pygame.error:
+            # some video drivers, like the dummy driver, have no system cursors
+            pass
+
+    def checkEvent(self, events: list = None):
         """
-        Checks for events in the game
+        Checks for the given events in the game, the ones in the queue if no events are given
         """
         mouseDown = False
         mouseUp = False
         hovering = False
+        # the objects are picked and edited, they need the state of the physics arrays
+        self.engine.sync()
 
-        for event in pygame.event.get():
+        for event in (pygame.event.get() if events is None else events):
             # set running to false if quit
             if event.type == pygame.QUIT:
                 self.running = False
-            # set mouseDown to True
-            if event.type == MOUSEBUTTONDOWN:
+            # the window was covered or restored, present all of it next frame
+            if event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                self.drawn_items = None
+            # set mouseDown to True, the buttons that move the camera do not click
+            if event.type == MOUSEBUTTONDOWN and event.button not in CAMERA_BUTTONS:
                 mouseDown = True
             # set mouseUp to True
-            if event.type == MOUSEBUTTONUP:
+            if event.type == MOUSEBUTTONUP and event.button not in CAMERA_BUTTONS:
                 mouseUp = True
+            # the wheel zooms in and out around the mouse, dragging with the right button pans
+            if event.type == MOUSEWHEEL:
+                self.camera.zoomAt(pygame.mouse.get_pos(), ZOOM_STEP ** event.y)
+            if event.type in (MOUSEBUTTONDOWN, MOUSEBUTTONUP) and event.button == PAN_BUTTON:
+                self.panning = event.type == MOUSEBUTTONDOWN
+            if event.type == MOUSEMOTION and self.panning:
+                self.camera.pan(*event.rel)
 
             if event.type == KEYDOWN:
                 if (self.is_typing):
@@ -245,9 +580,37 @@ class Game:
                     if (not self.is_typing):
                         # if the user is no longer typing, set pressedButton to None
                         self.pressedButton = None
+                        # the edited values take effect in the physics too
+                        self.sendBody(self.showing_stat_of)
+                        self.point_renderer.invalidate()
                 if event.key == K_p:
                     # if p is pressed, change the bool in paused
                     self.paused = not self.paused
+                # F3 shows and hides the frame times
+                if event.key == K_F3:
+                    self.toggleProfiler()
+                # home goes back to the default view
+                if event.key == K_HOME:
+                    self.camera.reset()
+                # g makes the small bodies add up their light where they are dense
+                if event.key == K_g:
+                    self.point_renderer.additive = not self.point_renderer.additive
+                    self.drawn_items = None
+                # F5 saves the scene, F9 loads it again
+                if event.key == K_F5:
+                    self.saveScene()
+                if event.key == K_F9 and os.path.exists(self.scene_path):
+                    self.loadScene()
+                # while replaying, the arrow keys seek and change the speed
+                if (self.state == "replay"):
+                    if event.key == K_LEFT:
+                        self.replay_seek -= 5
+                    if event.key == K_RIGHT:
+                        self.replay_seek += 5
+                    if event.key == K_UP:
+                        self.replay_speed *= 2
+                    if event.key == K_DOWN:
+                        self.replay_speed /= 2
 
         keys = pygame.key.get_pressed()
         # escape key also stops the game
@@ -257,67 +620,84 @@ class Game:
         # get the (x,y) position of mouse
         mouse_pos = pygame.mouse.get_pos()
 
-        for obj in self.objects:
-            if (obj.mouseOnObj(mouse_pos)):
-                # if the mouse is on an object change the cursor
-                pygame.mouse.set_system_cursor(pygame.SYSTEM_CURSOR_HAND)
-                obj.glow = True
-                hovering = True
-                # if the user clicks on an object whose stats is being shown, the user may relocate the object
-                if (mouseDown and self.showing_stat_of == obj):
-                    self.obj_on_mouse = obj
-                    self.obj_on_mouse.obj_on_mouse = True
-                    self.relocating = True
-                    break
-                # if the user clicks on an object whose stats is not shown, show the stats
-                elif (mouseDown and self.showing_stat_of != obj):
-                    # close the Infobox of any other object first
-                    if (self.showing_stat_of != None):
-                        self.showing_stat_of.show_stats = False
-                        self.doButtonAction(499) # 499 is to disable showing stats
-                    self.showing_stat_of = obj
-                    obj.show_stats = True
-                    # add buttons to self.buttons
-                    obj_buttons = obj.getButtons()
-                    for button in obj_buttons:
-                        self.addButton(button)
-                    break
-                mouseDown = False
-            # if the mouse is not on the object, set its glow to False
+        # find the object under the mouse, the grid only follows the objects after they moved
+        if (self.pick_grid_stale):
+            if (self.engine.source is self.objects):
+                # the engine arrays hold the same positions, they are faster to read than the objects
+                self.pick_grid.build(self.objects, self.engine.x, self.engine.y)
             else:
-                obj.glow = False
+                self.pick_grid.build(self.objects)
+            self.pick_grid_stale = False
+        obj = self.pick_grid.query(self.camera.screenToWorld(mouse_pos))
+        # only the objects the mouse enters or leaves change their glow
+        if (obj is not self.hovered_obj):
+            if (self.hovered_obj):
+                self.hovered_obj.glow = False
+            if (obj):
+                obj.glow = True
+            self.hovered_obj = obj
 
-        for button in self.buttons:
-            # if the mouse is on a button, change the color, change the cursor
-            if (button.mouseOnButton(mouse_pos)):
-                button.updateColor(button.getHalfColor(button.default_bgcolor))
-                pygame.mouse.set_system_cursor(button.cursor_type)
-                hovering = True
-                if mouseDown:
-                    # if mouse is pressed on a button, but the user had been typing on another input box,
-                    #  reset the input box and stop typing on that input box
-                    if (self.pressedButton and (400 <= self.pressedButton.purpose < 500)):
-                        self.pressedButton.is_typing = False
-                        if (self.showing_stat_of):
-                            self.showing_stat_of.info_box.resetToObject()
-                    self.pressedButton = button
-                    self.doButtonAction(button.purpose)
-                    mouseDown = False
-                # if the user drags an object onto the delete/cancle button, and lets go of mouse, do its action
-                elif (mouseUp and button.purpose == 398):
-                    self.doButtonAction(button.purpose)
-                break
-            else:
-                #if the mosue is not on the button, change the color of the button to default
-                button.updateColor(button.default_bgcolor)
+        if (obj):
+            # if the mouse is on an object change the cursor
+            self.setCursor(pygame.SYSTEM_CURSOR_HAND)
+            hovering = True
+            # if the user clicks on an object whose stats is being shown, the user may relocate the object
+            if (mouseDown and self.showing_stat_of == obj):
+                self.obj_on_mouse = obj
+                self.objects.hold(obj)
+                if (self.worker):
+                    self.worker.send("hold", obj.handle, True)
+                self.relocating = True
+            # if the user clicks on an object whose stats is not shown, show the stats
+            elif (mouseDown and self.showing_stat_of != obj):
+                # close the Infobox of any other object first
+                if (self.showing_stat_of != None):
+                    self.showing_stat_of.show_stats = False
+                    self.doButtonAction(499) # 499 is to disable showing stats
+                self.showing_stat_of = obj
+                obj.show_stats = True
+                # add buttons to self.buttons
+                obj_buttons = obj.getButtons()
+                for button in obj_buttons:
+                    self.addButton(button)
+
+        # the first button the mouse is on
+        button = next((button for button in self.buttons if button.mouseOnButton(mouse_pos)), None)
+        # only the buttons the mouse enters or leaves change color
+        if (button is not self.hovered_button):
+            if (self.hovered_button):
+                self.hovered_button.setHover(False)
+            if (button):
+                button.setHover(True)
+            self.hovered_button = button
+
+        # if the mouse is on a button, change the cursor
+        if (button):
+            self.setCursor(button.cursor_type)
+            hovering = True
+            if mouseDown:
+                # if mouse is pressed on a button, but the user had been typing on another input box,
+                #  reset the input box and stop typing on that input box
+                if (self.pressedButton and (400 <= self.pressedButton.purpose < 500)):
+                    self.pressedButton.is_typing = False
+                    if (self.showing_stat_of):
+                        self.showing_stat_of.info_box.resetToObject()
+                self.pressedButton = button
+                self.doButtonAction(button.purpose)
+                mouseDown = False
+            # if the user drags an object onto the delete/cancle button, and lets go of mouse, do its action
+            elif (mouseUp and button.purpose == 398):
+                self.doButtonAction(button.purpose)
 
         # if the mouse is not on any objects or buttons, set cursor to an arrow
         if (not hovering):
-            pygame.mouse.set_cursor(pygame.SYSTEM_CURSOR_ARROW)
+            self.setCursor(pygame.SYSTEM_CURSOR_ARROW)
 
         # if the user was relocating an object and lets go of mouse, stop relocating that object
         if (mouseUp and self.relocating and self.obj_on_mouse):
-            self.obj_on_mouse.obj_on_mouse = False
+            self.objects.release(self.obj_on_mouse)
+            if (self.worker):
+                self.worker.send("hold", self.obj_on_mouse.handle, False)
             self.obj_on_mouse = None
             self.relocating = False
 
@@ -325,101 +705,362 @@ class Game:
         # if the user clicks on the screen when theres an object on the mouse, add the object to the list
         # and remove it from the mouse
         if (mouseDown and self.obj_on_mouse and not self.relocating):
+            # the screen may have been waiting for events, place the object where the mouse is now
+            self.updateObjOnMouse()
             self.addObject(self.obj_on_mouse)
             self.obj_on_mouse = None
             # if the object is an planet, let the user set its velocity by dragging the mouse
-            if (type(self.objects[len(self.objects) - 1]) != Attractor):
-                self.userSettingVelocity(self.objects[len(self.objects) - 1])
+            if (self.objects[len(self.objects) - 1].getType() == "P"):
+                self.velocity_obj = self.objects[len(self.objects) - 1]
+                self.state = "velocity"
 
-    def mainMenu(self):
+    def renderObjOnMouse(self):
         """
-        Sets up the main menu where the user can either choose an template or create an custon system
+        Renders the object on the mouse
         """
-        # add two buttons 
-        self.addButton(TextButton(SCREEN[0]/ 2, SCREEN[1]/2, "Choose Template", 101))
-        self.addButton(TextButton(SCREEN[0]/ 2, SCREEN[1]/2 - 30, "Custom System", 102))
-        # check for events and render
-        while (self.running):
-            self.checkEvent()
-            self.render()
+        if (self.obj_on_mouse):
+            self.obj_on_mouse.display(self.window, self.camera)
 
-        # if the user clicks "Choose Template"
-        if self.menu_choice == 101:
-            self.templateScreen()
-        # if the user clicks "Custon System"
-        elif self.menu_choice == 102:
-            self.userEdit()
+    def updateObjOnMouse(self):
+        """
+        Updates position of the object on mouse to the position of mouse
+        """
+        if (self.obj_on_mouse):
+            self.obj_on_mouse.setPosition(self.camera.screenToWorld(pygame.mouse.get_pos()))
+            # an object being relocated is in the grid
+            if (self.relocating):
+                self.pick_grid_stale = True
+                self.sendBody(self.obj_on_mouse)
 
-    def templateScreen(self):
+    def runScene(self, path: str):
         """
-        Sets up screen where user can choose a template to run
+        Runs the scene saved at path, skipping the menus
         """
         self.reset()
-        self.menu_choice = -1
-        # add buttons for systems
-        self.addButton(TextButton(SCREEN[0]/2, SCREEN[1]/2 - 30, "Binary Sun", 201))
-        self.addButton(TextButton(SCREEN[0]/2, SCREEN[1]/2, "Sun Earth Moon", 202))
-        while (self.running):
-            self.checkEvent()
-            self.render()
-        self.reset()
-        # if user chooses binary sun system
-        if (self.menu_choice == 201):
-            self.binarySun()
-        # if user chooses sun earth mood system
-        elif (self.menu_choice == 202):
-            self.basicSetup()
+        self.scene_path = path
+        self.addBasicButtons()
+        self.loadScene(path)
+        self.mainLoop("preview")
 
-        # if the user had choosen an system, run
-        if (self.menu_choice != -1):
-            self.run()
+    def startRecording(self, path: str):
+        """
+        Starts writing the state of every body after each step to the file at path
+        """
+        self.stopRecording()
+        self.recorder = TrajectoryRecorder(path)
+        if (self.worker):
+            self.worker.send("record", self.recorder)
 
-    def renderObjOnMouse(self):
+    def stopRecording(self):
         """
-        Renders the object on the mouse
+        Finishes writing the recording, if there is one
         """
-        if (self.obj_on_mouse):
-            self.obj_on_mouse.display(self.window)
+        if (self.recorder):
+            if (self.worker):
+                # the worker is writing to it, it closes the recorder itself
+                self.worker.send("record", None)
+            else:
+                self.recorder.close()
+            self.recorder = None
 
-    def updateObjOnMouse(self):
+    def toggleProfiler(self):
         """
-        Updates position of the object on mouse to the position of mouse
+        Shows or hides the frame times, they are only measured while shown or while they are written to profile_path
         """
-        if (self.obj_on_mouse):
-            self.obj_on_mouse.setPosition(pygame.mouse.get_pos())
+        self.show_profiler = not self.show_profiler
+        if (self.show_profiler and self.profiler_hud is None):
+            self.profiler_hud = ProfilerHUD(self.profiler)
+        self.profiler.setEnabled(self.show_profiler or self.profile_path is not None)
+
+    def startWorker(self):
+        """
+        Hands the engine to a PhysicsWorker that steps it on its own thread
+        """
+        # the worker loads the objects into the arrays of its own
+        self.engine.invalidate()
+        self.worker = PhysicsWorker(self.engine, self.collisions, self.physics_rate)
+        # the profiler is not thread safe, the force pass is not timed on the worker
+        self.engine.profiler = None
+        self.worker.recorder = self.recorder
+        # loads sent to the worker and what of its snapshots was already taken over
+        self.worker_loads = 0
+        self.worker_epoch = None
+        self.worker_step = None
+        self.worker_paused = self.paused
+        self.worker.send("pause", self.paused)
+        self.sendBodies()
+        self.worker.start()
+
+    def stopWorker(self):
+        """
+        Stops the PhysicsWorker, the bodies keep the state of its newest snapshot
+        """
+        if (self.worker):
+            self.worker.stop()
+            self.applySnapshot(1.0)
+            self.worker = None
+            self.engine.profiler = self.profiler
+
+    def sendBodies(self):
+        """
+        Sends every body to the worker, replacing the ones it has
+        """
+        arrays = arraysFromObjects(self.objects)
+        self.worker.send("load", arrays, [obj.handle for obj in self.objects], [obj.obj_on_mouse for obj in self.objects])
+        self.worker_loads += 1
+
+    def sendBody(self, obj: Object):
+        """
+        Sends the state of the given object to the worker, or to the engine if there is no worker
+        """
+        if (self.worker and obj and obj.handle is not None):
+            velx, vely = (obj.velx, obj.vely) if obj.getType() == "P" else (0.0, 0.0)
+            self.worker.send("set", obj.handle, obj.x, obj.y, velx, vely, obj.mass, tuple(obj.color))
+        elif (obj):
+            # the next step loads the edited objects
+            self.engine.invalidate()
+
+    def applySnapshot(self, alpha: float = None):
+        """
+        Moves the objects to where the worker has them, alpha of the way from its second newest snapshot
+        to its newest one (by default the fraction of a step that passed since the newest one)
+        """
+        worker = self.worker
+        if (self.paused != self.worker_paused):
+            worker.send("pause", self.paused)
+            self.worker_paused = self.paused
+        previous, latest = worker.snapshots
+        # snapshots of bodies from before the last load are out of date
+        if (latest is None or latest["loads"] != self.worker_loads):
+            return
+        if (latest["epoch"] != self.worker_epoch):
+            # bodies were merged, take their new mass and radius and remove the ones that are gone
+            alive = set(latest["handles"].tolist())
+            self.removeObjects([obj for obj in self.objects if obj.handle not in alive])
+            self.worker_objects = [self.objects.get(handle) for handle in latest["handles"].tolist()]
+            for obj, mass, radius in zip(self.worker_objects, latest["mass"].tolist(), latest["radius"].tolist()):
+                obj.mass = mass
+                obj.radius = int(radius)
+            self.worker_planets = np.array([i for i, obj in enumerate(self.worker_objects) if obj.getType() == "P"], dtype=np.intp)
+            self.worker_epoch = latest["epoch"]
+        if (latest["step"] != self.worker_step):
+            # a new step was taken, the trails and the InfoBox follow the steps
+            if (self.show_trial):
+                planets = self.worker_planets
+                self.trails.push([self.worker_objects[i] for i in planets.tolist()], latest["x"][planets], latest["y"][planets])
+            else:
+                self.trails.clear()
+            self.worker_step = latest["step"]
+        if (alpha is None):
+            alpha = min(max((time.perf_counter() - latest["time"]) * worker.rate, 0.0), 1.0)
+        state = [latest[name] for name in ("x", "y", "velx", "vely")]
+        if (previous["epoch"] == latest["epoch"] and alpha < 1):
+            state = [previous[name] + (now - previous[name]) * alpha for name, now in zip(("x", "y", "velx", "vely"), state)]
+        for obj, x, y, velx, vely in zip(self.worker_objects, *[values.tolist() for values in state]):
+            # the body on the mouse is placed by the user
+            if (not obj.obj_on_mouse):
+                obj.x = x
+                obj.y = y
+                if (obj.getType() == "P"):
+                    obj.velx = velx
+                    obj.vely = vely
+        self.pick_grid_stale = True
+
+    def showFrame(self, reader: TrajectoryReader, i: int):
+        """
+        Moves the bodies to where they are in frame i of the recording, building them again if the bodies changed
+        """
+        states = reader.frame(i)
+        if (reader.keyframeOf(i) != self.replay_keyframe):
+            self.showKeyframe(reader, i)
+        else:
+            for obj, (x, y, velx, vely) in zip(self.objects, states.tolist()):
+                obj.x = x
+                obj.y = y
+                if (obj.getType() == "P"):
+                    obj.velx = velx
+                    obj.vely = vely
+        self.pick_grid_stale = True
+        self.pushFrame(reader, i)
+
+    def showKeyframe(self, reader: TrajectoryReader, i: int):
+        """
+        Builds the bodies of frame i of the recording, with new trails since the old bodies are gone
+        """
+        states = reader.frame(i)
+        bodies = reader.bodies(i)
+        if (self.showing_stat_of):
+            self.doButtonAction(499)
+        self.objects = BodyRegistry()
+        self.objects.extend(objectsFromArrays({"kind": bodies["kind"], "x": states[:, 0].astype(float),
+                                               "y": states[:, 1].astype(float), "velx": states[:, 2].astype(float),
+                                               "vely": states[:, 3].astype(float), "mass": bodies["mass"],
+                                               "radius": bodies["radius"], "color": bodies["color"]}))
+        # a fresh store, clearing would keep the rows of the old bodies
+        self.setTrailMode(self.trail_mode)
+        self.replay_planets = self.objects.dynamicIndices()
+        self.replay_planet_objs = [self.objects[k] for k in self.replay_planets.tolist()]
+        self.hovered_obj = None
+        self.replay_keyframe = reader.keyframeOf(i)
 
-    def userSettingVelocity(self, obj: Object):
+    def pushFrame(self, reader: TrajectoryReader, i: int):
         """
-        Handles the user setting velocity of an object when creating a custom system
+        Adds the positions of frame i of the recording to the trails, the frame has the bodies being shown
         """
-        settingVel = True
-        while(settingVel):
+        if (self.show_trial):
+            states = reader.frame(i)
+            self.trails.push(self.replay_planet_objs, states[self.replay_planets, 0], states[self.replay_planets, 1])
+        else:
+            self.trails.clear()
+
+    def userSettingVelocity(self, events: list):
+        """
+        Sets the velocity of the planet that was just placed from how far the user drags the mouse,
+        until the mouse is let go
+        """
+        obj = self.velocity_obj
+        pos = pygame.mouse.get_pos()
+        # the velocity follows how far the mouse is dragged in the window, whatever the zoom
+        x, y = self.camera.worldToScreen(obj.x, obj.y)
+        obj.setVelocity((x - pos[0])/50, (y - pos[1])/50)
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.running = False
             # if the user lets go of mouse, stop setting velocity
-            for event in pygame.event.get():
-                if event.type == MOUSEBUTTONUP:
-                    settingVel = False
-            # change velocity of object based on how far the user drags the mouse
-            pos = pygame.mouse.get_pos()
-            obj.setVelocity((obj.x - pos[0])/50, (obj.y - pos[1])/50)
-            self.render()
+            if event.type == MOUSEBUTTONUP and event.button not in CAMERA_BUTTONS:
+                # back to editing, the screen is still set up
+                self.state = "edit"
 
-    def userEdit(self):
+    def replay(self, path: str):
         """
-        Creates screen where the user creates a custom system
+        Plays back a recording without running the physics, the arrow keys seek and change the speed
         """
+        self.replay_reader = TrajectoryReader(path)
         self.reset()
-        # add the buttons need for the user
-        self.addButton(TextButton(SCREEN[0]-70, 200, "Attractor", 301))
-        self.addButton(TextButton(SCREEN[0] - 70, 230, "Star", 302))
-        self.addButton(TextButton(SCREEN[0] - 70, 260, "Planet", 303))
-        self.addButton(TextButton(0, 0, "START", 399))
-        self.addButton(TextButton(SCREEN[0] - 150, SCREEN[1] - 40, "Delete / Cancel", 398, font_size=20))
-        while (self.running):
-            self.checkEvent()
-            self.updateObjOnMouse()
-            self.render()
-        # if the user presses start
-        if (self.menu_choice == 0):
+        self.addBasicButtons()
+        self.replay_keyframe = None
+        # indices and objects of the planets of the bodies being shown
+        self.replay_planets = None
+        self.replay_planet_objs = []
+        self.replay_speed = 1.0
+        self.replay_seek = 0.0
+        # position in the recording in frames, and the last frame shown
+        self.replay_position = 0.0
+        self.replay_shown = -1
+        if (len(self.replay_reader) > 0):
+            self.mainLoop("replay")
+
+    def stepReplay(self, frame_time: float):
+        """
+        Moves the replay forward by the given seconds at the replay speed, and by any seek the user asked for
+        """
+        reader = self.replay_reader
+        if (not self.paused):
+            self.replay_position += min(frame_time, 0.25) * self.physics_rate * self.replay_speed
+        self.replay_position = min(max(self.replay_position + self.replay_seek * self.physics_rate, 0), len(reader) - 1)
+        self.replay_seek = 0.0
+        frame = int(self.replay_position)
+        shown = self.replay_shown
+        if (frame != shown):
+            # every skipped frame still adds to the trails, unless the jump is longer than the trails
+            first = frame if (frame < shown or frame - shown > TRAIL_LENGTH) else shown + 1
+            if (first == frame):
+                self.trails.clear()
+            # the skipped frames only add to the trails, the bodies are only moved to the shown frame
+            for i in range(first, frame):
+                if (reader.keyframeOf(i) != self.replay_keyframe):
+                    self.showKeyframe(reader, i)
+                self.pushFrame(reader, i)
+            self.showFrame(reader, frame)
+            self.replay_shown = frame
+
+    def stepPhysics(self, frame_time: float):
+        """
+        Runs as many fixed steps as fit in the given seconds, or takes the newest state of the physics worker
+        """
+        if (self.worker):
+            # the worker steps on its own, draw the bodies between its last two steps
+            self.applySnapshot()
+        # dont update when the game is paused
+        elif not self.paused:
+            # limit the catch up after a long frame so the simulation cannot fall further and further behind
+            self.accumulator += min(frame_time, 0.25)
+            while (self.accumulator >= 1 / self.physics_rate):
+                self.update()
+                self.accumulator -= 1 / self.physics_rate
+        else:
+            self.accumulator = 0.0
+
+    def setState(self, state: str):
+        """
+        Switches to the given screen and sets it up:
+        "menu", "templates", "edit", "velocity", "preview", "running", "replay" or "quit"
+        """
+        self.state = state
+        self.running = True
+        if (state == "menu"):
+            self.reset()
+            self.menu_choice = -1
+            # add two buttons
+            self.addButton(TextButton(SCREEN[0]/ 2, SCREEN[1]/2, "Choose Template", 101))
+            self.addButton(TextButton(SCREEN[0]/ 2, SCREEN[1]/2 - 30, "Custom System", 102))
+        elif (state == "templates"):
+            self.reset()
+            self.menu_choice = -1
+            # add buttons for systems
+            self.addButton(TextButton(SCREEN[0]/2, SCREEN[1]/2 - 30, "Binary Sun", 201))
+            self.addButton(TextButton(SCREEN[0]/2, SCREEN[1]/2, "Sun Earth Moon", 202))
+            for i, (purpose, (text, generator)) in enumerate(GENERATORS.items()):
+                self.addButton(TextButton(SCREEN[0]/2, SCREEN[1]/2 + 30 * (i + 1), text, purpose))
+        elif (state == "edit"):
+            self.reset()
+            self.menu_choice = -1
+            # add the buttons need for the user
+            self.addButton(TextButton(SCREEN[0]-70, 200, "Attractor", 301))
+            self.addButton(TextButton(SCREEN[0] - 70, 230, "Star", 302))
+            self.addButton(TextButton(SCREEN[0] - 70, 260, "Planet", 303))
+            self.addButton(TextButton(0, 0, "START", 399))
+            self.addButton(TextButton(SCREEN[0] - 150, SCREEN[1] - 40, "Delete / Cancel", 398, font_size=20))
+        elif (state == "preview"):
+            # the system is shown for a moment before it starts moving
+            self.state_end = time.perf_counter() + PREVIEW_SECONDS
+        elif (state == "running"):
+            self.draw_velocity = False
+            # real time that has passed but has not been simulated yet
+            self.accumulator = 0.0
+            self.clock.tick()
+            if (self.async_physics):
+                self.startWorker()
+        elif (state == "replay"):
+            self.clock.tick()
+        elif (state == "quit"):
+            self.stopWorker()
+
+    def leaveState(self):
+        """
+        Moves on from a screen that stopped running, to the screen the user chose or out of the game
+        """
+        if (self.state == "menu" and self.menu_choice == 101):
+            # if the user clicks "Choose Template"
+            self.setState("templates")
+        elif (self.state == "menu" and self.menu_choice == 102):
+            # if the user clicks "Custon System"
+            self.setState("edit")
+        elif (self.state == "templates" and self.menu_choice in (201, 202)):
+            self.reset()
+            # if user chooses binary sun system
+            if (self.menu_choice == 201):
+                self.binarySun()
+            # if user chooses sun earth mood system
+            else:
+                self.basicSetup()
+            self.setState("preview")
+        elif (self.state == "templates" and self.menu_choice in GENERATORS):
+            self.reset()
+            self.generateScene(GENERATORS[self.menu_choice][1])
+            self.setState("preview")
+        elif (self.state == "edit" and self.menu_choice == 0):
+            # if the user presses start
             self.buttons = []
             # stop showing stats of any object
             if(self.showing_stat_of):
@@ -427,28 +1068,81 @@ class Game:
                 self.showing_stat_of = None
             # add basic buttons and run
             self.addBasicButtons()
-            self.run()
+            self.engine.setIntegrator("leapfrog", substeps=4)
+            self.setState("preview")
+        else:
+            self.setState("quit")
 
-    def run(self):
+    def waitEvents(self, timeout: int):
         """
-        Runs a user drawn system or a template system
+        Sleeps until there is an event or timeout milliseconds passed, and returns the events
         """
-        clock = pygame.time.Clock()        
-        # render and sleep for few seconds to let the user see the setup
-        self.render()
-        self.checkEvent()
-        time.sleep(2)
-    
-        self.running = True
-        self.draw_velocity = False
-        while(self.running):
-            clock.tick(60)
+        event = pygame.event.wait(timeout)
+        events = [] if event.type == NOEVENT else [event]
+        return events + pygame.event.get()
+
+    def mainLoop(self, state: str = "menu"):
+        """
+        Runs the game from the given screen until the user quits. Screens that only change when the user
+        does something wait for events, the running system and replays are drawn at up to 60 frames per second
+        """
+        self.setState(state)
+        while (self.state != "quit"):
+            if (self.state in IDLE_STATES):
+                timeout = IDLE_TIMEOUT
+                if (self.state == "preview"):
+                    timeout = min(timeout, max(int((self.state_end - time.perf_counter()) * 1000), 1))
+                events = self.waitEvents(timeout)
+                frame_time = self.clock.tick() / 1000
+            else:
+                # clock.tick returns the milliseconds since the last frame
+                frame_time = self.clock.tick(60) / 1000
+                events = pygame.event.get()
+
             # checkEvent tracks keyboard and mouse presses
-            self.checkEvent()
-            self.updateObjOnMouse()
-            
-            # dont update when the game is paused
-            # update and render
-            if not self.paused:
-                self.update()
+            self.profiler.begin("events")
+            if (self.state == "velocity"):
+                self.userSettingVelocity(events)
+            else:
+                self.checkEvent(events)
+            self.profiler.end("events")
+            if (not self.running):
+                self.leaveState()
+                continue
+
+            if (self.state == "edit"):
+                self.updateObjOnMouse()
+            elif (self.state == "preview"):
+                if (time.perf_counter() >= self.state_end):
+                    self.setState("running")
+            elif (self.state == "running"):
+                self.updateObjOnMouse()
+                self.stepPhysics(frame_time)
+            elif (self.state == "replay"):
+                self.stepReplay(frame_time)
             self.render()
+            self.profiler.endFrame()
+
+    def mainMenu(self):
+        """
+        Sets up the main menu where the user can either choose an template or create an custon system
+        """
+        self.mainLoop("menu")
+
+    def templateScreen(self):
+        """
+        Sets up screen where user can choose a template to run
+        """
+        self.mainLoop("templates")
+
+    def userEdit(self):
+        """
+        Creates screen where the user creates a custom system
+        """
+        self.mainLoop("edit")
+
+    def run(self):
+        """
+        Runs a user drawn system or a template system
+        """
+        self.mainLoop("preview")
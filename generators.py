@@ -0,0 +1,155 @@
+"""
+Builds large systems of bodies directly as packed arrays (see snapshot.arraysFromObjects), so scenes with
+hundreds of thousands of bodies can be made without a Python loop per body. Every generator takes the number
+of bodies n and a seed, the same seed always gives the same scene.
+The Planets are one pixel in radius. They are placed at random, so the densest scenes start with bodies
+touching, which the game lets pass through each other until they are clear (see CollisionHandler.exemptOverlaps).
+"""
+import numpy as np
+from classes import *
+from snapshot import KINDS
+
+# center of the screen, every scene is built around it
+CENTER = (SCREEN[0] / 2, SCREEN[1] / 2)
+# radius of every generated Planet
+PLANET_RADIUS = 1
+
+
+def packArrays(kind, x, y, velx, vely, mass, radius, color):
+    """
+    Returns the packed arrays of bodies with the given properties, scalars are used for every body
+    """
+    n = len(x)
+    return {
+        "kind": np.broadcast_to(np.asarray(kind, dtype=np.uint8), (n,)).copy(),
+        "x": np.asarray(x, dtype=float),
+        "y": np.asarray(y, dtype=float),
+        "velx": np.broadcast_to(np.asarray(velx, dtype=float), (n,)).copy(),
+        "vely": np.broadcast_to(np.asarray(vely, dtype=float), (n,)).copy(),
+        "mass": np.broadcast_to(np.asarray(mass, dtype=float), (n,)).copy(),
+        "radius": np.broadcast_to(np.asarray(radius, dtype=np.int32), (n,)).copy(),
+        "color": np.broadcast_to(np.asarray(color, dtype=np.uint8), (n, 3)).copy(),
+    }
+
+
+def joinArrays(*parts):
+    """
+    Returns the packed arrays holding the bodies of all the given packed arrays
+    """
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+
+def attractorArrays(mass: float, radius: int, color: tuple, center: tuple = CENTER):
+    """
+    Returns the packed arrays of one Attractor
+    """
+    return packArrays(KINDS["A"], [center[0]], [center[1]], 0, 0, mass, radius, color)
+
+
+def circularOrbits(rng, dist, central_mass: float, mass, center: tuple = CENTER):
+    """
+    Places bodies at the given distances from center at random angles, moving counterclockwise on circular
+    orbits around central_mass plus the mass of the bodies closer to the center. Returns x, y, velx and vely
+    """
+    angle = rng.uniform(0, 2 * np.pi, len(dist))
+    # mass of the bodies inside every orbit, as if it was all at the center
+    order = np.argsort(dist)
+    inside = np.empty(len(dist))
+    inside[order] = np.cumsum(np.broadcast_to(mass, dist.shape)[order])
+    speed = np.sqrt(G * (central_mass + inside) / dist)
+    cos = np.cos(angle)
+    sin = np.sin(angle)
+    return center[0] + dist * cos, center[1] + dist * sin, -speed * sin, speed * cos
+
+
+def samplePlummer(rng, n: int, total_mass: float, scale: float, center: tuple = CENTER, velocity: tuple = (0, 0),
+                  color: tuple = WHITE):
+    """
+    Returns the packed arrays of n Planets in a Plummer sphere of the given mass and scale radius.
+    Radii and speeds follow the 3D Plummer model, and are turned in random directions in the plane
+    """
+    # the enclosed mass fraction is uniform in the radius, the few bodies beyond 10 scale radii are left out
+    enclosed = rng.uniform(1e-6, 0.985, n)
+    r = 1 / np.sqrt(enclosed ** (-2 / 3) - 1)
+    # speed as a fraction q of the escape speed, drawn from q^2 (1 - q^2)^3.5 by rejection
+    q = np.empty(0)
+    while (len(q) < n):
+        candidates = rng.uniform(0, 1, 3 * n)
+        accepted = rng.uniform(0, 0.1, 3 * n) < candidates**2 * (1 - candidates**2) ** 3.5
+        q = np.concatenate((q, candidates[accepted]))
+    speed = q[:n] * np.sqrt(2) * (1 + r**2) ** -0.25 * np.sqrt(G * total_mass / scale)
+    angle = rng.uniform(0, 2 * np.pi, n)
+    direction = rng.uniform(0, 2 * np.pi, n)
+    r = r * scale
+    return packArrays(KINDS["P"], center[0] + r * np.cos(angle), center[1] + r * np.sin(angle),
+                      velocity[0] + speed * np.cos(direction), velocity[1] + speed * np.sin(direction),
+                      total_mass / n, PLANET_RADIUS, color)
+
+
+def plummerSphere(n: int, seed: int = 0):
+    """
+    Returns a Plummer sphere of n Planets in the middle of the screen
+    """
+    rng = np.random.default_rng(seed)
+    return samplePlummer(rng, n, 200, 60, color=(255, 240, 200))
+
+
+def galacticDisk(n: int, seed: int = 0):
+    """
+    Returns an Attractor with a disk of n - 1 Planets around it, whose density falls off exponentially
+    with the distance, on circular orbits
+    """
+    rng = np.random.default_rng(seed)
+    central_mass = 400
+    n -= 1
+    # an exponential disk has r * exp(-r / h) bodies at distance r, a gamma distribution of shape 2
+    dist = rng.gamma(2, 70, n)
+    # bodies inside the attractor or beyond the edge are drawn again, clipping would pile them up on the limits
+    outside = (dist < 30) | (dist > 290)
+    while (outside.any()):
+        dist[outside] = rng.gamma(2, 70, outside.sum())
+        outside = (dist < 30) | (dist > 290)
+    mass = 100 / max(n, 1)
+    x, y, velx, vely = circularOrbits(rng, dist, central_mass, mass)
+    # bodies go from yellow in the middle to blue at the edge
+    shade = np.round((dist - 30) / 260 * 4) / 4
+    color = np.column_stack((255 * (1 - shade), 255 * (1 - shade / 2), 120 + 135 * shade))
+    return joinArrays(attractorArrays(central_mass, 20, YELLOW), packArrays(KINDS["P"], x, y, velx, vely, mass, PLANET_RADIUS, color))
+
+
+def planetaryRings(n: int, seed: int = 0):
+    """
+    Returns an Attractor as the planet with n - 1 light Planets in three rings around it
+    """
+    rng = np.random.default_rng(seed)
+    central_mass = 400
+    n -= 1
+    # inner and outer edge and share of the bodies of every ring
+    rings = np.array([(45, 75, 0.25), (82, 125, 0.5), (133, 150, 0.25)])
+    ring = rng.choice(len(rings), n, p=rings[:, 2])
+    dist = rng.uniform(rings[ring, 0], rings[ring, 1])
+    x, y, velx, vely = circularOrbits(rng, dist, central_mass, 0)
+    # a little random motion keeps the rings from looking perfectly still
+    velx += rng.normal(0, 0.01, n)
+    vely += rng.normal(0, 0.01, n)
+    color = np.array([(200, 180, 150), (230, 215, 185), (170, 160, 150)])[ring]
+    return joinArrays(attractorArrays(central_mass, 25, (220, 190, 120)), packArrays(KINDS["P"], x, y, velx, vely, 1e-4, PLANET_RADIUS, color))
+
+
+def collidingClusters(n: int, seed: int = 0):
+    """
+    Returns two Plummer spheres of about n / 2 Planets each, falling towards each other off center
+    """
+    rng = np.random.default_rng(seed)
+    first = samplePlummer(rng, n // 2, 100, 30, (CENTER[0] - 200, CENTER[1] - 40), (1, 0), (255, 200, 150))
+    second = samplePlummer(rng, n - n // 2, 100, 30, (CENTER[0] + 200, CENTER[1] + 40), (-1, 0), (150, 200, 255))
+    return joinArrays(first, second)
+
+
+# generators shown on the template screen, by the purpose of their button
+GENERATORS = {
+    203: ("Plummer Sphere", plummerSphere),
+    204: ("Galactic Disk", galacticDisk),
+    205: ("Planetary Rings", planetaryRings),
+    206: ("Colliding Clusters", collidingClusters),
+}
@@ -0,0 +1,142 @@
+"""
+Runs a simulation without opening a window and writes the final state and some stats as JSON.
+
+    python headless.py --template basicSetup --steps 10000 --out final.json
+    python headless.py --scene final.json --steps 5000 --solver barnes-hut --theta 0.7
+    python headless.py --template galacticDisk --bodies 100000 --steps 100 --solver particle-mesh --out disk.npz
+"""
+import argparse
+import json
+import os
+import time
+# keep stdout clean for the stats
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+from game_file import *
+from collisions import COLLISION_MODES
+from generators import GENERATORS
+
+# generated scenes by the name of their function
+GENERATED = {generator.__name__: generator for text, generator in GENERATORS.values()}
+TEMPLATES = ("basicSetup", "binarySun") + tuple(GENERATED)
+
+
+def objectToDict(obj: Object):
+    """
+    Returns the state of the given object as a dictionary
+    """
+    body = {"type": obj.getType(), "x": obj.x, "y": obj.y, "mass": obj.mass, "radius": obj.radius, "color": list(obj.color)}
+    if (obj.getType() == "P"):
+        body["velx"] = obj.velx
+        body["vely"] = obj.vely
+    return body
+
+
+def objectFromDict(body: dict):
+    """
+    Returns a Planet or an Attractor built from the given dictionary
+    """
+    if (body["type"] == "A"):
+        return Attractor(body["x"], body["y"], body["radius"], mass=body["mass"], color=tuple(body["color"]))
+    return Planet(body["x"], body["y"], body["radius"], velx=body.get("velx", 0), vely=body.get("vely", 0),
+                  mass=body["mass"], color=tuple(body["color"]))
+
+
+def loadScene(game: Game, path: str):
+    """
+    Adds the bodies stored in the given JSON file, or .npz snapshot, to the game
+    """
+    if (path.endswith(".npz")):
+        game.loadScene(path)
+        return
+    with open(path) as file:
+        scene = json.load(file)
+    for body in scene["bodies"]:
+        game.addObject(objectFromDict(body))
+
+
+def simulate(game: Game, steps: int):
+    """
+    Steps the game as fast as possible and returns the stats of the run
+    """
+    # trails are only drawn, there is no need to keep them
+    game.show_trial = False
+    game.engine.load(game.objects)
+    start_energy = game.engine.findEnergy()
+    start = time.perf_counter()
+    for i in range(steps):
+        game.update()
+    seconds = time.perf_counter() - start
+    # the arrays hold the newest state, the objects get it for the output
+    game.engine.sync()
+    end_energy = game.engine.findEnergy()
+    return {
+        "steps": steps,
+        "bodies": len(game.objects),
+        "integrator": game.engine.integrator,
+        "dt": game.engine.dt,
+        "substeps": game.engine.substeps,
+        "solver": type(game.engine.solver).__name__,
+        "seconds": seconds,
+        "steps_per_second": steps / seconds if seconds > 0 else None,
+        "start_energy": start_energy,
+        "end_energy": end_energy,
+        "energy_drift": abs((end_energy - start_energy) / start_energy) if start_energy != 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a planet simulation without a window")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--template", choices=TEMPLATES, help="built in system to start from")
+    source.add_argument("--scene", help="JSON file written by a previous run, or .npz snapshot, to start from")
+    parser.add_argument("--bodies", type=int, default=2000, help="number of bodies of a generated template")
+    parser.add_argument("--seed", type=int, default=0, help="seed of a generated template")
+    parser.add_argument("--steps", type=int, default=1000, help="number of physics steps to run")
+    parser.add_argument("--integrator", choices=INTEGRATORS, help="overrides the integrator of the scene")
+    parser.add_argument("--dt", type=float, help="overrides the time advanced by every step")
+    parser.add_argument("--substeps", type=int, help="overrides the number of substeps every step is split into")
+    parser.add_argument("--softening", type=float, help="overrides the softening length of the scene")
+    parser.add_argument("--solver", choices=SOLVERS, help="overrides how the accelerations are found")
+    parser.add_argument("--theta", type=float, default=0.5, help="opening angle of the barnes-hut solver")
+    parser.add_argument("--workers", type=int, help="number of processes of the parallel solver")
+    parser.add_argument("--collisions", choices=COLLISION_MODES, help="overrides what happens to bodies that touch")
+    parser.add_argument("--record", help="file every step is recorded to, it can be replayed with main.py --replay")
+    parser.add_argument("--out", default="final_state.json",
+                        help="file the final state and stats are written to, a .npz file only gets the final state")
+    args = parser.parse_args()
+
+    # fonts are needed by the InfoBoxes of the objects, the display is never initialized
+    pygame.font.init()
+    game = Game(None)
+    game.collision_mode = args.collisions
+    if (args.template in GENERATED):
+        game.generateScene(GENERATED[args.template], args.bodies, args.seed)
+    elif (args.template):
+        getattr(game, args.template)()
+    else:
+        loadScene(game, args.scene)
+    engine = game.engine
+    engine.setIntegrator(args.integrator if args.integrator else engine.integrator,
+                         dt=args.dt if args.dt else engine.dt, substeps=args.substeps if args.substeps else engine.substeps)
+    if (args.softening is not None):
+        engine.softening = args.softening
+    if (args.solver):
+        engine.close()
+        engine.solver = makeSolver(args.solver, theta=args.theta, workers=args.workers)
+
+    if (args.record):
+        game.startRecording(args.record)
+    stats = simulate(game, args.steps)
+    game.stopRecording()
+    engine.close()
+    if (args.out.endswith(".npz")):
+        game.saveScene(args.out)
+    else:
+        with open(args.out, "w") as file:
+            json.dump({"stats": stats, "bodies": [objectToDict(obj) for obj in game.objects]}, file, indent=1)
+    print(json.dumps(stats, indent=1))
+
+
+if __name__ == "__main__":
+    main()
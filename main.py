@@ -1,14 +1,55 @@
+import argparse
 import pygame
 from game_file import *
 
+parser = argparse.ArgumentParser(description="Planet simulation")
+parser.add_argument("--dirty-rects", action="store_true", help="only present the parts of the window that changed")
+parser.add_argument("--trails", choices=("buffer", "fade"), default="buffer",
+                    help="keep past positions in a ring buffer or draw trails onto a fading layer")
+parser.add_argument("--collisions", choices=("merge", "bounce", "ignore"),
+                    help="what happens to bodies that touch, by default every scene chooses")
+parser.add_argument("--solver", choices=SOLVERS,
+                    help="how the accelerations are found, by default every scene chooses its own")
+parser.add_argument("--async-physics", action="store_true", help="step the physics on its own thread")
+parser.add_argument("--scene", help=".npz scene saved with F5 to start from instead of the menu")
+parser.add_argument("--record", help="file every physics step is recorded to")
+parser.add_argument("--replay", help="recording to play back instead of running the physics")
+parser.add_argument("--bodies", type=int, default=2000, help="number of bodies in the generated scenes of the template screen")
+parser.add_argument("--seed", type=int, default=0, help="seed of the generated scenes")
+parser.add_argument("--glow", action="store_true", help="small bodies add up their light where they are dense, G toggles it")
+parser.add_argument("--profile", help="times every frame and writes the times to this .csv or .json file at the end")
+args = parser.parse_args()
+
 # initialize pygame
 pygame.init()
 window = pygame.display.set_mode(SCREEN)
 
 pygame.display.set_caption("Planet simulation")
 
-# initialize a Game object and call mainMenu
+# initialize a Game object and start its main loop
 game = Game(window)
-game.mainMenu()
+game.dirty_rendering = args.dirty_rects
+game.setTrailMode(args.trails)
+game.collision_mode = args.collisions
+game.solver_name = args.solver
+game.async_physics = args.async_physics
+game.generated_bodies = args.bodies
+game.seed = args.seed
+game.point_renderer.additive = args.glow
+if (args.profile):
+    game.profile_path = args.profile
+    game.profiler.setEnabled(True)
+if (args.record):
+    game.startRecording(args.record)
+if (args.replay):
+    game.replay(args.replay)
+elif (args.scene):
+    game.runScene(args.scene)
+else:
+    game.mainLoop("menu")
+game.stopRecording()
+if (args.profile):
+    game.profiler.export(args.profile)
+game.engine.close()
 
-pygame.quit()
\ No newline at end of file
+pygame.quit()
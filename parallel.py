@@ -0,0 +1,117 @@
+import os
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from physics import BLOCK, DirectSolver, directBlock
+
+# shared memory blocks a worker process has attached to, by name
+attached = {}
+
+
+def sharedArrays(buffer, capacity: int):
+    """
+    Returns the x, y, mass, accx, accy and targets arrays laid out in the given shared buffer
+    """
+    floats = np.ndarray((5, capacity), dtype=np.float64, buffer=buffer)
+    targets = np.ndarray((capacity,), dtype=np.intp, buffer=buffer, offset=floats.nbytes)
+    return floats[0], floats[1], floats[2], floats[3], floats[4], targets
+
+
+def computeChunk(task: tuple):
+    """
+    Runs in a worker process: computes the accelerations of targets[start:end] and writes them into shared memory
+    """
+    name, capacity, n, start, end, block, softening = task
+    if name not in attached:
+        # forget the blocks of previous calls, only the latest one is in use
+        for shm in attached.values():
+            shm.close()
+        attached.clear()
+        attached[name] = shared_memory.SharedMemory(name=name)
+    x, y, mass, accx, accy, targets = sharedArrays(attached[name].buf, capacity)
+    # same blocks as DirectSolver so the results are identical to the single process path
+    for row in range(start, end, block):
+        rows = targets[row:min(row + block, end)]
+        accx[row:row + len(rows)], accy[row:row + len(rows)] = directBlock(x[:n], y[:n], mass[:n], rows, softening)
+    return end - start
+
+
+class ParallelSolver:
+    """
+    Direct summation split into chunks of targets over a pool of worker processes.
+    Positions and masses are copied into shared memory and the workers write the accelerations back into it,
+    only the chunk bounds are sent to the workers on every step
+    """
+    def __init__(self, workers: int = None, chunks: int = None, block: int = BLOCK, min_bodies: int = 2000):
+        # number of worker processes, every core by default
+        self.workers = workers if workers else (os.cpu_count() or 1)
+        # number of chunks the targets are split into, a few per worker to balance the load
+        self.chunks = chunks if chunks else self.workers * 4
+        # rows computed at once inside a chunk, same meaning as DirectSolver.block
+        self.block = block
+        # below this many bodies, the accelerations are computed in this process
+        self.min_bodies = min_bodies
+        self.pool = None
+        self.shm = None
+        self.capacity = 0
+
+    def chunkBounds(self, count: int):
+        """
+        Returns the (start, end) of every chunk of the given number of targets, chunks are whole blocks
+        """
+        blocks = -(-count // self.block)
+        per_chunk = max(1, -(-blocks // self.chunks)) * self.block
+        return [(start, min(start + per_chunk, count)) for start in range(0, count, per_chunk)]
+
+    def reserve(self, count: int):
+        """
+        Makes sure the shared memory can hold the given number of bodies
+        """
+        if (count <= self.capacity):
+            return
+        if (self.shm):
+            self.arrays = None
+            self.shm.close()
+            self.shm.unlink()
+        # grow geometrically so the block is not reallocated every time a body is added
+        self.capacity = max(count, 2 * self.capacity, 1024)
+        nbytes = self.capacity * (5 * np.dtype(np.float64).itemsize + np.dtype(np.intp).itemsize)
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.arrays = sharedArrays(self.shm.buf, self.capacity)
+
+    def accelerations(self, x, y, mass, targets=None, softening: float = 0.0):
+        """
+        Returns the x and y components of the acceleration of the bodies at the indices in targets
+        (every body if targets is None)
+        """
+        if targets is None:
+            targets = np.arange(len(x))
+        if (len(x) < self.min_bodies or self.workers == 1):
+            return DirectSolver(self.block).accelerations(x, y, mass, targets, softening)
+        n = len(x)
+        self.reserve(n)
+        if (self.pool is None):
+            # started after the first shared block so the workers share this process's resource tracker
+            self.pool = get_context().Pool(self.workers)
+        shared_x, shared_y, shared_mass, shared_accx, shared_accy, shared_targets = self.arrays
+        shared_x[:n] = x
+        shared_y[:n] = y
+        shared_mass[:n] = mass
+        shared_targets[:len(targets)] = targets
+        tasks = [(self.shm.name, self.capacity, n, start, end, self.block, softening) for start, end in self.chunkBounds(len(targets))]
+        self.pool.map(computeChunk, tasks)
+        return shared_accx[:len(targets)].copy(), shared_accy[:len(targets)].copy()
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared memory
+        """
+        if (self.pool):
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if (self.shm):
+            self.arrays = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+            self.capacity = 0
@@ -0,0 +1,93 @@
+import numpy as np
+from classes import *
+
+
+class ParticleMeshSolver:
+    """
+    Finds the accelerations on a mesh covering the screen: the masses are spread onto the mesh with
+    cloud-in-cell weights, the potential is found with an FFT and the accelerations are interpolated back.
+    The cost grows with the number of bodies plus the number of mesh points instead of the number of pairs
+    """
+    def __init__(self, grid: tuple = (256, 160), softening: float = None):
+        # number of mesh points in x and y
+        self.nx = grid[0]
+        self.ny = grid[1]
+        # smallest softening used in the potential, one mesh cell by default
+        self.softening = softening
+        # fourier transform of the potential of a unit mass, reused while the mesh does not change
+        self.kernel = None
+        self.kernel_key = None
+
+    def findDomain(self, x, y):
+        """
+        Returns the corner and the spacing of the mesh, it covers SCREEN and every body that left it
+        """
+        x0 = min(0.0, x.min())
+        y0 = min(0.0, y.min())
+        x1 = max(float(SCREEN[0]), x.max())
+        y1 = max(float(SCREEN[1]), y.max())
+        return x0, y0, (x1 - x0) / (self.nx - 1), (y1 - y0) / (self.ny - 1)
+
+    def findKernel(self, hx: float, hy: float, softening: float = 0.0):
+        """
+        Returns the fourier transform of the potential of a unit mass on the zero padded mesh
+        """
+        eps = max(softening, self.softening if self.softening else min(hx, hy))
+        key = (self.nx, self.ny, hx, hy, eps)
+        if (self.kernel_key != key):
+            # distances wrap around so the padded half holds the negative offsets
+            dx = np.minimum(np.arange(2 * self.nx), 2 * self.nx - np.arange(2 * self.nx)) * hx
+            dy = np.minimum(np.arange(2 * self.ny), 2 * self.ny - np.arange(2 * self.ny)) * hy
+            dist = np.sqrt(dx[:, np.newaxis]**2 + dy[np.newaxis, :]**2 + eps**2)
+            self.kernel = np.fft.rfft2(-G / dist)
+            self.kernel_key = key
+        return self.kernel
+
+    def cloudInCell(self, x, y, x0: float, y0: float, hx: float, hy: float):
+        """
+        Returns the flat index of the lower left mesh point of every body and the weights of the four points around it
+        """
+        fx = (x - x0) / hx
+        fy = (y - y0) / hy
+        ix = np.clip(np.floor(fx).astype(np.intp), 0, self.nx - 2)
+        iy = np.clip(np.floor(fy).astype(np.intp), 0, self.ny - 2)
+        tx = fx - ix
+        ty = fy - iy
+        index = ix * self.ny + iy
+        weights = ((1 - tx) * (1 - ty), (1 - tx) * ty, tx * (1 - ty), tx * ty)
+        return index, weights
+
+    def accelerations(self, x, y, mass, targets=None, softening: float = 0.0):
+        """
+        Returns the x and y components of the acceleration of the bodies at the indices in targets
+        (every body if targets is None)
+        """
+        if targets is None:
+            targets = np.arange(len(x))
+        if (len(targets) == 0):
+            return np.zeros(0), np.zeros(0)
+        x0, y0, hx, hy = self.findDomain(x, y)
+        offsets = (0, 1, self.ny, self.ny + 1)
+
+        # deposit the mass of every body onto the four mesh points around it
+        index, weights = self.cloudInCell(x, y, x0, y0, hx, hy)
+        density = np.zeros(self.nx * self.ny)
+        for offset, weight in zip(offsets, weights):
+            density += np.bincount(index + offset, weights=mass * weight, minlength=self.nx * self.ny)
+
+        # convolve with the potential of a unit mass, the padding keeps the mesh from wrapping around
+        padded = np.zeros((2 * self.nx, 2 * self.ny))
+        padded[:self.nx, :self.ny] = density.reshape(self.nx, self.ny)
+        potential = np.fft.irfft2(np.fft.rfft2(padded) * self.findKernel(hx, hy, softening), s=padded.shape)[:self.nx, :self.ny]
+        grad_x, grad_y = np.gradient(potential, hx, hy)
+
+        # interpolate the acceleration back with the same weights
+        index, weights = self.cloudInCell(x[targets], y[targets], x0, y0, hx, hy)
+        accx = np.zeros(len(targets))
+        accy = np.zeros(len(targets))
+        grad_x = grad_x.ravel()
+        grad_y = grad_y.ravel()
+        for offset, weight in zip(offsets, weights):
+            accx -= grad_x[index + offset] * weight
+            accy -= grad_y[index + offset] * weight
+        return accx, accy
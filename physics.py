@@ -0,0 +1,420 @@
+import numpy as np
+from classes import *
+from registry import BodyRegistry
+
+# coefficients of the fourth order Yoshida integrator, c are the drifts and d the kicks
+YOSHIDA_W1 = 1 / (2 - 2**(1/3))
+YOSHIDA_W0 = -(2**(1/3)) * YOSHIDA_W1
+YOSHIDA_C = (YOSHIDA_W1 / 2, (YOSHIDA_W0 + YOSHIDA_W1) / 2, (YOSHIDA_W0 + YOSHIDA_W1) / 2, YOSHIDA_W1 / 2)
+YOSHIDA_D = (YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1)
+INTEGRATORS = ("euler", "leapfrog", "yoshida4", "rk4", "block")
+# number of rows of the pairwise matrices built at once, unless the solver has a block size of its own
+BLOCK = 512
+
+
+class DirectSolver:
+    """
+    Computes the gravitational acceleration of every body by direct summation over every other body
+    """
+    def __init__(self, block: int = BLOCK):
+        # number of target bodies handled at once, limits the size of the pairwise matrices
+        self.block = block
+
+    def accelerations(self, x, y, mass, targets=None, softening: float = 0.0):
+        """
+        Returns the x and y components of the acceleration of the bodies at the indices in targets
+        (every body if targets is None) caused by all the other bodies.
+        softening is added to every distance in quadrature so close pairs stay finite
+        """
+        if targets is None:
+            targets = np.arange(len(x))
+        accx = np.zeros(len(targets))
+        accy = np.zeros(len(targets))
+        for start in range(0, len(targets), self.block):
+            rows = targets[start:start + self.block]
+            accx[start:start + len(rows)], accy[start:start + len(rows)] = directBlock(x, y, mass, rows, softening)
+        return accx, accy
+
+
+def directBlock(x, y, mass, rows, softening: float = 0.0):
+    """
+    Returns the acceleration of the bodies at the indices in rows from every other body
+    """
+    # dx[i, j] is the x distance from body rows[i] to body j
+    dx = x[np.newaxis, :] - x[rows, np.newaxis]
+    dy = y[np.newaxis, :] - y[rows, np.newaxis]
+    dist_sq = dx * dx + dy * dy + softening**2
+    # a body exerts no force onto itself
+    dist_sq[np.arange(len(rows)), rows] = np.inf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # G * m / r^2 along the unit vector (dx, dy) / r
+        inv_dist_cube = G / (dist_sq * np.sqrt(dist_sq))
+        return (dx * inv_dist_cube).dot(mass), (dy * inv_dist_cube).dot(mass)
+
+
+class Engine:
+    """
+    Stores the position, velocity and mass of every body as numpy arrays and advances them all at once.
+    The arrays hold the state of the bodies between steps, the Planet and Attractor objects are only loaded
+    again when bodies were added, removed, held or edited, and only written back when sync is called
+    """
+    def __init__(self, solver: object = None):
+        # solver used to find the accelerations
+        self.solver = solver if solver else DirectSolver()
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.velx = np.zeros(0)
+        self.vely = np.zeros(0)
+        self.accx = np.zeros(0)
+        self.accy = np.zeros(0)
+        self.mass = np.zeros(0)
+        # indices of the bodies that move, attractors and objects held by the mouse stay in place
+        self.dynamic = np.zeros(0, dtype=np.intp)
+        # length added to every distance in quadrature, keeps close encounters finite
+        self.softening = 0.0
+        # accuracy of the block timesteps, a body's step is eta * sqrt(|acc| / |jerk|)
+        self.eta = 0.05
+        # a step may be halved at most max_level times for the block integrator
+        self.max_level = 8
+        # jerk (time derivative of the acceleration) of the moving bodies, and the bodies it was found for
+        self.jerkx = np.zeros(0)
+        self.jerky = np.zeros(0)
+        self.jerk_of = None
+        # solver, softening and moving bodies the accelerations were found with where the bodies are now,
+        # None when they have to be found again
+        self.acc_of = None
+        # BodyRegistry the arrays were loaded from, what it looked like then, and if the objects have the
+        # state of the arrays
+        self.source = None
+        self.source_key = None
+        self.synced = True
+        # FrameProfiler the force pass is timed with, None to not time it
+        self.profiler = None
+        self.setIntegrator("euler")
+
+    def setIntegrator(self, integrator: str, dt: float = 1.0, substeps: int = 1):
+        """
+        Sets the integrator, the time advanced by every step and the number of substeps it is split into
+        """
+        if integrator not in INTEGRATORS:
+            raise ValueError("unknown integrator " + integrator)
+        self.integrator = integrator
+        self.dt = dt
+        self.substeps = substeps
+
+    def load(self, objects: list):
+        """
+        Copies the state of the given objects (a BodyRegistry or a list) into the arrays
+        """
+        self.x = np.array([obj.x for obj in objects], dtype=float)
+        self.y = np.array([obj.y for obj in objects], dtype=float)
+        self.mass = np.array([obj.mass for obj in objects], dtype=float)
+        if (isinstance(objects, BodyRegistry)):
+            self.dynamic = objects.movingIndices()
+        else:
+            self.dynamic = np.array([i for i, obj in enumerate(objects) if obj.getType() == "P" and not obj.obj_on_mouse], dtype=np.intp)
+        self.velx = np.zeros(len(objects))
+        self.vely = np.zeros(len(objects))
+        self.velx[self.dynamic] = [objects[i].velx for i in self.dynamic]
+        self.vely[self.dynamic] = [objects[i].vely for i in self.dynamic]
+        self.accx = np.zeros(len(objects))
+        self.accy = np.zeros(len(objects))
+        self.jerk_of = None
+        self.acc_of = None
+        self.source = objects
+        self.source_key = self.keyOf(objects)
+        self.synced = True
+
+    def store(self, objects: list):
+        """
+        Writes the state of the moving bodies back into the given objects
+        """
+        for i, x, y, velx, vely, accx, accy in zip(self.dynamic.tolist(), self.x[self.dynamic].tolist(), self.y[self.dynamic].tolist(),
+                                                   self.velx[self.dynamic].tolist(), self.vely[self.dynamic].tolist(),
+                                                   self.accx[self.dynamic].tolist(), self.accy[self.dynamic].tolist()):
+            obj = objects[i]
+            obj.x = x
+            obj.y = y
+            obj.velx = velx
+            obj.vely = vely
+            obj.accx = accx
+            obj.accy = accy
+
+    def keyOf(self, objects: list):
+        """
+        Returns what the bodies of the given BodyRegistry look like to the arrays: its version and its index
+        arrays, which are built again when bodies are held or released. Lists have no key
+        """
+        if (isinstance(objects, BodyRegistry)):
+            return (objects.version, objects.findArrays())
+        return None
+
+    def holds(self, objects: list):
+        """
+        Returns whether the arrays hold the state of the bodies of the given objects
+        """
+        key = self.keyOf(objects)
+        return objects is self.source and key is not None and key[0] == self.source_key[0] and key[1] is self.source_key[1]
+
+    def attach(self, objects: list):
+        """
+        Loads the given objects, unless the arrays already hold their state
+        """
+        if (not self.holds(objects)):
+            self.load(objects)
+
+    def sync(self):
+        """
+        Writes the state of the arrays back into the objects they were loaded from, if it changed since
+        """
+        if (not self.synced and self.source is not None):
+            self.store(self.source)
+        self.synced = True
+
+    def remove(self, objects: list, removed: list):
+        """
+        Removes the given bodies from the given BodyRegistry. If the arrays hold the state of its bodies they
+        are changed the same way, by moving the last body into the place of every removed one, so they need
+        not be loaded again
+        """
+        attached = self.holds(objects)
+        if (not attached):
+            # the objects are loaded again with their new indices
+            self.sync()
+        arrays = [self.x, self.y, self.velx, self.vely, self.accx, self.accy, self.mass]
+        for obj in removed:
+            i = objects.indexOf(obj)
+            objects.remove(obj)
+            if (attached):
+                for array in arrays:
+                    array[i] = array[len(objects)]
+        if (attached):
+            self.x, self.y, self.velx, self.vely, self.accx, self.accy, self.mass = [array[:len(objects)] for array in arrays]
+            self.dynamic = objects.movingIndices()
+            self.jerk_of = None
+            # the removed bodies no longer pull on the others
+            self.acc_of = None
+            self.source_key = self.keyOf(objects)
+
+    def invalidate(self):
+        """
+        Syncs the objects and forgets them, so the next step loads them again. Called after an object was
+        edited or the arrays were taken over by something else
+        """
+        self.sync()
+        self.source = None
+        self.acc_of = None
+
+    def changed(self):
+        """
+        Notes that positions or masses in the arrays were changed from outside, so the accelerations
+        are found again before they are used
+        """
+        self.acc_of = None
+
+    def hasAcc(self):
+        """
+        Returns whether accx and accy hold the accelerations of the moving bodies where they are now,
+        found with the current solver and softening
+        """
+        return (self.acc_of is not None and self.acc_of[0] is self.solver and self.acc_of[1] == self.softening
+                and self.acc_of[2] is self.dynamic)
+
+    def findAcc(self):
+        """
+        Updates the acceleration of every moving body
+        """
+        self.findAccOf(self.dynamic)
+        self.acc_of = (self.solver, self.softening, self.dynamic)
+
+    def findAccOf(self, bodies):
+        """
+        Updates the acceleration of the bodies at the given indices
+        """
+        if (self.profiler):
+            self.profiler.begin("update.force")
+        self.accx[bodies], self.accy[bodies] = self.solver.accelerations(self.x, self.y, self.mass, bodies, self.softening)
+        if (self.profiler):
+            self.profiler.end("update.force")
+
+    def findEnergy(self):
+        """
+        Returns the kinetic plus the potential energy of the loaded bodies
+        """
+        d = self.dynamic
+        energy = 0.5 * np.sum(self.mass[d] * (self.velx[d]**2 + self.vely[d]**2))
+        block = getattr(self.solver, "block", BLOCK)
+        for start in range(0, len(self.x), block):
+            rows = np.arange(start, min(start + block, len(self.x)))
+            dx = self.x[np.newaxis, :] - self.x[rows, np.newaxis]
+            dy = self.y[np.newaxis, :] - self.y[rows, np.newaxis]
+            dist = np.sqrt(dx * dx + dy * dy + self.softening**2)
+            # count every pair once
+            pairs = np.arange(len(self.x))[np.newaxis, :] > rows[:, np.newaxis]
+            with np.errstate(divide="ignore"):
+                energy -= G * np.sum(np.where(pairs, self.mass[np.newaxis, :] / dist, 0.0), axis=1).dot(self.mass[rows])
+        return float(energy)
+
+    def kick(self, h: float):
+        """
+        Advances the velocity of the moving bodies by h with their current acceleration
+        """
+        self.velx[self.dynamic] += self.accx[self.dynamic] * h
+        self.vely[self.dynamic] += self.accy[self.dynamic] * h
+
+    def drift(self, h: float):
+        """
+        Advances the position of the moving bodies by h with their current velocity
+        """
+        self.x[self.dynamic] += self.velx[self.dynamic] * h
+        self.y[self.dynamic] += self.vely[self.dynamic] * h
+        self.acc_of = None
+
+    def stepRK4(self, h: float):
+        """
+        Advances the moving bodies by h with the classic fourth order Runge-Kutta method
+        """
+        d = self.dynamic
+        x0, y0, velx0, vely0 = self.x[d], self.y[d], self.velx[d], self.vely[d]
+        # slopes of the position are velocities, slopes of the velocity are accelerations
+        slopes = []
+        for fraction in (0, 0.5, 0.5, 1):
+            if slopes:
+                prev_vx, prev_vy, prev_ax, prev_ay = slopes[-1]
+                self.x[d] = x0 + prev_vx * h * fraction
+                self.y[d] = y0 + prev_vy * h * fraction
+                velx = velx0 + prev_ax * h * fraction
+                vely = vely0 + prev_ay * h * fraction
+            else:
+                velx, vely = velx0, vely0
+            self.findAcc()
+            slopes.append((velx, vely, self.accx[d].copy(), self.accy[d].copy()))
+        weights = (1, 2, 2, 1)
+        self.x[d] = x0 + h / 6 * sum(w * k[0] for w, k in zip(weights, slopes))
+        self.y[d] = y0 + h / 6 * sum(w * k[1] for w, k in zip(weights, slopes))
+        self.velx[d] = velx0 + h / 6 * sum(w * k[2] for w, k in zip(weights, slopes))
+        self.vely[d] = vely0 + h / 6 * sum(w * k[3] for w, k in zip(weights, slopes))
+        self.acc_of = None
+
+    def estimateJerk(self, delta: float):
+        """
+        Finds the jerk of every moving body from the change of its acceleration over a drift of delta,
+        with the same solver as the accelerations
+        """
+        d = self.dynamic
+        x, y = self.x[d], self.y[d]
+        accx, accy = self.accx[d], self.accy[d]
+        acc_of = self.acc_of
+        self.drift(delta)
+        self.findAcc()
+        self.jerkx = (self.accx[d] - accx) / delta
+        self.jerky = (self.accy[d] - accy) / delta
+        self.x[d], self.y[d] = x, y
+        self.accx[d], self.accy[d] = accx, accy
+        self.acc_of = acc_of
+        self.jerk_of = d.copy()
+
+    def findLevels(self, h: float):
+        """
+        Returns the level of every moving body, a body at level k advances in steps of h / 2^k.
+        The jerk comes from the last two accelerations of every body, it is only estimated with an extra
+        force pass when the moving bodies changed since the last step
+        """
+        d = self.dynamic
+        if (self.jerk_of is None or not np.array_equal(self.jerk_of, d)):
+            self.estimateJerk(h / (1 << self.max_level))
+        acc = np.hypot(self.accx[d], self.accy[d])
+        jerk = np.hypot(self.jerkx, self.jerky)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # bodies without jerk can take the whole step
+            wanted = np.where(jerk > 0, self.eta * np.sqrt(acc / jerk), h)
+            levels = np.ceil(np.log2(h / wanted))
+        return np.clip(np.nan_to_num(levels, nan=self.max_level), 0, self.max_level).astype(np.int64)
+
+    def stepBlock(self, h: float):
+        """
+        Advances the moving bodies by h with leapfrog on hierarchical power of two timesteps.
+        Every body is drifted on the finest step but only kicked, and only has its acceleration found,
+        at the end of its own step
+        """
+        d = self.dynamic
+        # the last tick of the step before found the accelerations of every body, unless something changed since
+        if (not self.hasAcc()):
+            self.findAcc()
+        levels = self.findLevels(h)
+        finest = int(levels.max()) if len(levels) else 0
+        ticks = 1 << finest
+        # number of finest steps in the step of each body
+        stride = 1 << (finest - levels)
+        body_dt = h / (1 << levels)
+        fine_dt = h / ticks
+        # every body opens its first step with half a kick
+        self.velx[d] += self.accx[d] * body_dt / 2
+        self.vely[d] += self.accy[d] * body_dt / 2
+        for tick in range(1, ticks + 1):
+            self.drift(fine_dt)
+            active = (tick % stride == 0)
+            bodies = d[active]
+            accx, accy = self.accx[bodies], self.accy[bodies]
+            self.findAccOf(bodies)
+            # the change of the acceleration over the step of a body gives its jerk for the next levels
+            self.jerkx[active] = (self.accx[bodies] - accx) / body_dt[active]
+            self.jerky[active] = (self.accy[bodies] - accy) / body_dt[active]
+            # close the step with half a kick and open the next one with another half, except at the end
+            kick = body_dt[active] if tick < ticks else body_dt[active] / 2
+            self.velx[bodies] += self.accx[bodies] * kick
+            self.vely[bodies] += self.accy[bodies] * kick
+        # every body is active on the last tick, so all the accelerations are where the bodies ended
+        self.acc_of = (self.solver, self.softening, d)
+
+    def step(self, objects: list):
+        """
+        Advances the given objects by dt, split into substeps of the chosen integrator.
+        The objects only get their new state when sync is called
+        """
+        self.attach(objects)
+        self.advance()
+        self.synced = False
+
+    def advance(self):
+        """
+        Advances the loaded arrays by dt, split into substeps of the chosen integrator
+        """
+        h = self.dt / self.substeps
+        if (self.integrator == "leapfrog"):
+            # kick-drift-kick, the acceleration at the end of a substep is reused at the start of the next,
+            # and at the start of the next step unless something changed since
+            if (not self.hasAcc()):
+                self.findAcc()
+            for i in range(self.substeps):
+                self.kick(h / 2)
+                self.drift(h)
+                self.findAcc()
+                self.kick(h / 2)
+        elif (self.integrator == "yoshida4"):
+            # three leapfrog steps with weights chosen to cancel the second order error
+            for i in range(self.substeps):
+                for c, d in zip(YOSHIDA_C, YOSHIDA_D):
+                    self.drift(c * h)
+                    self.findAcc()
+                    self.kick(d * h)
+                self.drift(YOSHIDA_C[3] * h)
+        elif (self.integrator == "rk4"):
+            for i in range(self.substeps):
+                self.stepRK4(h)
+        elif (self.integrator == "block"):
+            for i in range(self.substeps):
+                self.stepBlock(h)
+        else:
+            # semi-implicit euler: update the velocity first, then the position with the new velocity
+            for i in range(self.substeps):
+                self.findAcc()
+                self.kick(h)
+                self.drift(h)
+
+    def close(self):
+        """
+        Frees anything the solver holds on to, like worker processes
+        """
+        if hasattr(self.solver, "close"):
+            self.solver.close()
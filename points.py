@@ -0,0 +1,88 @@
+"""
+Draws many small bodies at once by writing their pixels straight into the window through pygame.surfarray.
+"""
+from operator import attrgetter
+import numpy as np
+import pygame
+
+
+class PointRenderer:
+    """
+    Draws bodies that are only a few pixels wide on the screen. Every body is stamped as a small disc of pixels,
+    all bodies with the same stamp are placed with one array operation, and the pixels are written in one go.
+    With additive on, the colors of bodies on the same pixel are added up (scaled by glow), so dense regions glow
+    """
+    def __init__(self, additive: bool = False, glow: float = 0.35):
+        self.additive = additive
+        self.glow = glow
+        # pixel offsets of the disc of every stamp radius
+        self.stamps = {}
+        # colors of the bodies of a registry, and the registry and version they were taken from
+        self.colors = None
+        self.key = None
+
+    def stampOf(self, radius: int):
+        """
+        Returns the x and y offsets of the pixels of a disc of the given radius, radius 0 is one pixel
+        """
+        if (radius not in self.stamps):
+            dx, dy = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+            inside = dx**2 + dy**2 <= radius**2
+            self.stamps[radius] = (dx[inside], dy[inside])
+        return self.stamps[radius]
+
+    def colorsOf(self, objects):
+        """
+        Returns the colors of the bodies in the given BodyRegistry as an (n, 3) array, the array is only built
+        again after bodies were added or removed or invalidate was called
+        """
+        key = (objects, objects.version)
+        if (self.key is None or key[0] is not self.key[0] or key[1] != self.key[1]):
+            self.colors = np.array(list(map(attrgetter("color"), objects)), dtype=np.uint8).reshape(-1, 3)
+            self.key = key
+        return self.colors
+
+    def invalidate(self):
+        """
+        Notes that the color of a body changed
+        """
+        self.key = None
+
+    def draw(self, win, x, y, radius, colors):
+        """
+        Draws bodies at the window positions (x, y) as discs of the given integer radii and colors.
+        Returns False without drawing if the pixels of win cannot be written directly
+        """
+        try:
+            # additive blending works on the color channels, plain drawing writes whole mapped pixels
+            pixels = pygame.surfarray.pixels3d(win) if self.additive else pygame.surfarray.pixels2d(win)
+        except ValueError:
+            # only some pixel formats can be referenced as an array
+            return False
+        width, height = pixels.shape[:2]
+        px = []
+        py = []
+        owner = []
+        for r in np.unique(radius).tolist():
+            bodies = np.flatnonzero(radius == r)
+            dx, dy = self.stampOf(r)
+            px.append((x[bodies, np.newaxis] + dx).ravel())
+            py.append((y[bodies, np.newaxis] + dy).ravel())
+            owner.append(np.repeat(bodies, len(dx)))
+        px = np.concatenate(px)
+        py = np.concatenate(py)
+        owner = np.concatenate(owner)
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        px, py, owner = px[inside], py[inside], owner[inside]
+        if (self.additive):
+            # add up the light falling on every pixel, then add it to what is there
+            flat = px * height + py
+            lit = np.flatnonzero(np.bincount(flat, minlength=width * height))
+            light = np.column_stack([np.bincount(flat, weights=colors[owner, c], minlength=width * height)[lit] for c in range(3)])
+            px, py = np.divmod(lit, height)
+            pixels[px, py] = np.minimum(pixels[px, py] + light * self.glow, 255).astype(np.uint8)
+        else:
+            pixels[px, py] = pygame.surfarray.map_array(win, colors)[owner]
+        # the window stays locked while the array exists
+        del pixels
+        return True
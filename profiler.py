@@ -0,0 +1,130 @@
+"""
+Times the sections of every frame and keeps the last frames of each section, for the HUD and for export.
+"""
+import csv
+import json
+import time
+from collections import deque
+import numpy as np
+from button import *
+
+# sections in the order they are shown, a section's time does not include the sections timed inside it
+SECTIONS = ("events", "update.force", "update.integrate", "update.collisions", "update.trails",
+            "render.trails", "render.bodies", "render.arrows", "render.buttons", "render.present")
+
+
+class FrameProfiler:
+    """
+    Measures how long every section of a frame takes. Sections can be nested, the time of the inner sections
+    is left out of the outer one. While disabled, begin and end return at once
+    """
+    def __init__(self, history: int = 600):
+        self.enabled = False
+        # number of frames kept for every section
+        self.history = history
+        # milliseconds of every section in the last frames, and in the frame being timed
+        self.samples = {section: deque(maxlen=history) for section in SECTIONS + ("frame",)}
+        self.current = {}
+        # open sections as [name, start, time of inner sections]
+        self.stack = []
+        self.frame_start = None
+
+    def setEnabled(self, enabled: bool):
+        """
+        Turns the timing on or off
+        """
+        self.enabled = enabled
+        self.stack = []
+        self.current = {}
+        self.frame_start = None
+
+    def begin(self, section: str):
+        """
+        Starts timing the given section
+        """
+        if (self.enabled):
+            self.stack.append([section, time.perf_counter(), 0.0])
+
+    def end(self, section: str):
+        """
+        Stops timing the section that was begun last, which has to be the given one
+        """
+        if (self.enabled and self.stack and self.stack[-1][0] == section):
+            name, start, inner = self.stack.pop()
+            elapsed = time.perf_counter() - start
+            self.current[name] = self.current.get(name, 0.0) + elapsed - inner
+            if (self.stack):
+                self.stack[-1][2] += elapsed
+
+    def endFrame(self):
+        """
+        Stores the times of the frame that just ended, sections that did not run in it took 0 ms
+        """
+        if (not self.enabled):
+            return
+        now = time.perf_counter()
+        if (self.frame_start is not None):
+            for section in SECTIONS:
+                self.samples[section].append(self.current.get(section, 0.0) * 1000)
+            self.samples["frame"].append((now - self.frame_start) * 1000)
+        self.current = {}
+        self.frame_start = now
+
+    def summary(self):
+        """
+        Returns the mean, median, 95th percentile and maximum milliseconds of every section
+        """
+        stats = {}
+        for section, samples in self.samples.items():
+            if (samples):
+                values = np.array(samples)
+                stats[section] = {"mean": float(values.mean()), "p50": float(np.median(values)),
+                                  "p95": float(np.percentile(values, 95)), "max": float(values.max())}
+        return stats
+
+    def export(self, path: str):
+        """
+        Writes the kept frames to path, as a CSV file with one row per frame if it ends with .csv,
+        as JSON with the summary and the frames otherwise
+        """
+        sections = SECTIONS + ("frame",)
+        if (path.endswith(".csv")):
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(sections)
+                writer.writerows(zip(*[self.samples[section] for section in sections]))
+        else:
+            with open(path, "w") as file:
+                json.dump({"summary": self.summary(), "frames": {section: list(self.samples[section]) for section in sections}}, file, indent=1)
+
+
+class ProfilerHUD:
+    """
+    Shows the times of the sections as a column of TextButtons in the corner of the window,
+    the text is only changed a few times a second so the buttons are rarely rendered again
+    """
+    def __init__(self, profiler: FrameProfiler, x: int = 10, y: int = 45, interval: float = 0.5):
+        self.profiler = profiler
+        self.interval = interval
+        self.last_update = 0.0
+        self.buttons = []
+        for section in SECTIONS + ("frame",):
+            self.buttons.append(TextButton(x, y, section, -1, myfont="Courier New", font_size=13,
+                                           textcolor=(255, 255, 255), bgcolor=(40, 40, 40), cursor_type=pygame.SYSTEM_CURSOR_ARROW))
+            y += self.buttons[-1].myrect.height
+        self.layer = UILayer(SCREEN)
+
+    def display(self, win):
+        """
+        Draws the times of the sections, updating them if interval seconds passed
+        """
+        now = time.perf_counter()
+        if (now - self.last_update >= self.interval):
+            stats = self.profiler.summary()
+            for section, button in zip(SECTIONS + ("frame",), self.buttons):
+                if (section in stats):
+                    button.text = "%-18s %7.2f ms  p95 %7.2f" % (section, stats[section]["mean"], stats[section]["p95"])
+                    button.updateText()
+                    button.updateRect()
+            self.last_update = now
+        self.layer.display(win, self.buttons)
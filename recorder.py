@@ -0,0 +1,149 @@
+"""
+Records the state of every body after each physics step to an append-only file and reads it back for replays.
+
+The data file holds two kinds of records, both padded to 16 bytes per body:
+a keyframe (kind, color, radius and mass of every body) whenever bodies are added or removed,
+and a frame (x, y, velx, vely as float32) after every step. The index file next to it
+holds one row per frame with the offset of the frame, its number of bodies and the offset of its keyframe.
+"""
+import queue
+import threading
+import numpy as np
+from snapshot import KINDS
+
+BODY_DTYPE = np.dtype([("kind", "u1"), ("color", "u1", 3), ("radius", "<i4"), ("mass", "<f8")])
+INDEX_DTYPE = np.dtype([("offset", "<i8"), ("count", "<i8"), ("keyframe", "<i8")])
+
+
+class TrajectoryRecorder:
+    """
+    Streams frames to the file at path on a background thread. The queue between the game and the thread
+    is bounded and blocks when full, so a slow disk slows the game down instead of losing frames.
+    If the thread fails, the next record or close raises a RuntimeError instead of waiting for it forever
+    """
+    def __init__(self, path: str, queue_size: int = 256):
+        self.path = path
+        self.data = open(path, "wb")
+        self.index = open(path + ".idx", "wb")
+        self.queue = queue.Queue(queue_size)
+        # registry and version the last keyframe was written for
+        self.key = None
+        self.frames = 0
+        # exception the background thread stopped with, None while it runs
+        self.error = None
+        self.thread = threading.Thread(target=self.write, daemon=True)
+        self.thread.start()
+
+    def record(self, objects, engine):
+        """
+        Queues the state of the given objects, which the engine arrays were just loaded from or stored into
+        """
+        # the registry itself is kept in the key, a new registry could otherwise reuse the id of an old one
+        key = (objects, objects.version)
+        if (self.key is None or key[0] is not self.key[0] or key[1] != self.key[1]):
+            self.recordKeyframe([KINDS[obj.getType()] for obj in objects], [obj.color for obj in objects],
+                                [obj.radius for obj in objects], [obj.mass for obj in objects])
+            self.key = key
+        self.recordFrame(engine.x, engine.y, engine.velx, engine.vely)
+
+    def recordKeyframe(self, kind, color, radius, mass):
+        """
+        Queues a keyframe, the frames after it have bodies with the given kinds, colors, radii and masses
+        """
+        bodies = np.zeros(len(kind), dtype=BODY_DTYPE)
+        bodies["kind"] = kind
+        bodies["color"] = np.array(color, dtype=np.uint8).reshape(-1, 3)
+        bodies["radius"] = radius
+        bodies["mass"] = mass
+        self.put(("keyframe", bodies))
+
+    def recordFrame(self, x, y, velx, vely):
+        """
+        Queues the positions and velocities of the bodies after a step
+        """
+        # the arrays keep changing, so the frame is copied before it is queued
+        self.put(("frame", np.column_stack((x, y, velx, vely)).astype(np.float32)))
+        self.frames += 1
+
+    def put(self, item: tuple):
+        """
+        Queues the given record for the background thread, waiting while the queue is full.
+        Raises a RuntimeError if the thread stopped and will never take it
+        """
+        while (True):
+            if (not self.thread.is_alive()):
+                raise RuntimeError("recording to " + self.path + " stopped") from self.error
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def write(self):
+        """
+        Writes the queued records until close puts None on the queue, runs on the background thread
+        """
+        offset = 0
+        keyframe = 0
+        try:
+            while (True):
+                item = self.queue.get()
+                if (item is None):
+                    break
+                kind, array = item
+                if (kind == "keyframe"):
+                    keyframe = offset
+                else:
+                    self.index.write(np.array([(offset, len(array), keyframe)], dtype=INDEX_DTYPE).tobytes())
+                self.data.write(array.tobytes())
+                offset += array.nbytes
+        except Exception as error:
+            # record and close raise it on the game's thread
+            self.error = error
+        finally:
+            self.data.close()
+            self.index.close()
+
+    def close(self):
+        """
+        Writes everything still queued and closes the files, raises a RuntimeError if not everything was written
+        """
+        if (self.thread.is_alive()):
+            self.put(None)
+            self.thread.join()
+        if (self.error):
+            raise RuntimeError("recording to " + self.path + " failed") from self.error
+
+
+class TrajectoryReader:
+    """
+    Reads a recording through a memory map, a frame is only read from disk when it is used
+    """
+    def __init__(self, path: str):
+        self.index = np.fromfile(path + ".idx", dtype=INDEX_DTYPE)
+        self.data = np.memmap(path, dtype=np.uint8, mode="r") if len(self.index) else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.index)
+
+    def keyframeOf(self, i: int):
+        """
+        Returns the offset of the keyframe of frame i, frames with the same offset have the same bodies
+        """
+        return int(self.index[i]["keyframe"])
+
+    def bodies(self, i: int):
+        """
+        Returns the kind, color, radius and mass of the bodies of frame i
+        """
+        start = self.keyframeOf(i)
+        count = int(self.index[i]["count"])
+        return self.data[start:start + count * BODY_DTYPE.itemsize].view(BODY_DTYPE)
+
+    def frame(self, i: int):
+        """
+        Returns the x, y, velx and vely of every body in frame i as the columns of an array
+        """
+        start = int(self.index[i]["offset"])
+        count = int(self.index[i]["count"])
+        return self.data[start:start + count * 16].view(np.float32).reshape(count, 4)
@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class BodyRegistry:
+    """
+    Stores the bodies of a game in one dense list. Every body gets an integer handle that never changes,
+    a body is removed by moving the last one into its slot, and the indices of the static bodies (attractors)
+    and the dynamic ones (planets) are kept in separate sets so the physics never has to check types.
+    It can be used like a list of the bodies
+    """
+    def __init__(self, objects: list = ()):
+        self.objects = []
+        # index of the body with every handle
+        self.index = {}
+        self.next_handle = 0
+        # indices of the bodies that never move, that move, and that are held in place by the mouse
+        self.static = set()
+        self.dynamic = set()
+        self.held = set()
+        # sorted arrays of the sets, built again after the sets change
+        self.arrays = None
+        # changes every time a body is added or removed
+        self.version = 0
+        for obj in objects:
+            self.add(obj)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __getitem__(self, i):
+        return self.objects[i]
+
+    def __contains__(self, obj: object):
+        i = self.index.get(getattr(obj, "handle", None))
+        return i is not None and self.objects[i] is obj
+
+    def add(self, obj: object):
+        """
+        Adds the given body and returns its handle
+        """
+        obj.handle = self.next_handle
+        self.next_handle += 1
+        i = len(self.objects)
+        self.objects.append(obj)
+        self.index[obj.handle] = i
+        if (obj.getType() == "P"):
+            self.dynamic.add(i)
+        else:
+            self.static.add(i)
+        if (obj.obj_on_mouse):
+            self.held.add(i)
+        self.arrays = None
+        self.version += 1
+        return obj.handle
+
+    def extend(self, objects: list):
+        """
+        Adds all the given bodies at once, faster than adding them one by one
+        """
+        start = len(self.objects)
+        handles = range(self.next_handle, self.next_handle + len(objects))
+        for obj, handle in zip(objects, handles):
+            obj.handle = handle
+        self.next_handle += len(objects)
+        self.objects.extend(objects)
+        self.index.update(zip(handles, range(start, len(self.objects))))
+        self.dynamic.update(i for i, obj in enumerate(objects, start) if obj.getType() == "P")
+        self.static.update(i for i, obj in enumerate(objects, start) if obj.getType() != "P")
+        self.held.update(i for i, obj in enumerate(objects, start) if obj.obj_on_mouse)
+        self.arrays = None
+        self.version += 1
+
+    def remove(self, obj: object):
+        """
+        Removes the given body by moving the last body into its place
+        """
+        i = self.index.pop(obj.handle)
+        last = len(self.objects) - 1
+        for indices in (self.static, self.dynamic, self.held):
+            indices.discard(i)
+        if (i != last):
+            moved = self.objects[last]
+            self.objects[i] = moved
+            self.index[moved.handle] = i
+            for indices in (self.static, self.dynamic, self.held):
+                if (last in indices):
+                    indices.discard(last)
+                    indices.add(i)
+        self.objects.pop()
+        obj.handle = None
+        self.arrays = None
+        self.version += 1
+
+    def get(self, handle: int):
+        """
+        Returns the body with the given handle, None if it was removed
+        """
+        i = self.index.get(handle)
+        return None if i is None else self.objects[i]
+
+    def indexOf(self, obj: object):
+        """
+        Returns the current index of the given body
+        """
+        return self.index[obj.handle]
+
+    def hold(self, obj: object):
+        """
+        Keeps the given body in place, it stays dynamic but is not moved by the physics
+        """
+        obj.obj_on_mouse = True
+        self.held.add(self.index[obj.handle])
+        self.arrays = None
+
+    def release(self, obj: object):
+        """
+        Lets the physics move the given body again
+        """
+        obj.obj_on_mouse = False
+        if (obj in self):
+            self.held.discard(self.index[obj.handle])
+            self.arrays = None
+
+    def findArrays(self):
+        """
+        Returns the sorted indices of the static bodies, the dynamic bodies and the dynamic bodies that are not held
+        """
+        if (self.arrays is None):
+            self.arrays = (np.array(sorted(self.static), dtype=np.intp), np.array(sorted(self.dynamic), dtype=np.intp),
+                           np.array(sorted(self.dynamic - self.held), dtype=np.intp))
+        return self.arrays
+
+    def staticIndices(self):
+        return self.findArrays()[0]
+
+    def dynamicIndices(self):
+        return self.findArrays()[1]
+
+    def movingIndices(self):
+        return self.findArrays()[2]
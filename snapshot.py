@@ -0,0 +1,76 @@
+"""
+Saves and loads scenes as .npz files holding one packed array per property of the bodies,
+plus the integrator settings the scene runs with.
+"""
+import gc
+import numpy as np
+from classes import *
+
+# value of the "kind" array for each type of body
+KINDS = {"A": 0, "P": 1}
+
+
+def arraysFromObjects(objects: list):
+    """
+    Returns the packed arrays describing the given Planets and Attractors
+    """
+    kind = np.array([KINDS[obj.getType()] for obj in objects], dtype=np.uint8)
+    dynamic = np.flatnonzero(kind == KINDS["P"])
+    velx = np.zeros(len(objects))
+    vely = np.zeros(len(objects))
+    velx[dynamic] = [objects[i].velx for i in dynamic.tolist()]
+    vely[dynamic] = [objects[i].vely for i in dynamic.tolist()]
+    return {
+        "kind": kind,
+        "x": np.array([obj.x for obj in objects], dtype=float),
+        "y": np.array([obj.y for obj in objects], dtype=float),
+        "velx": velx,
+        "vely": vely,
+        "mass": np.array([obj.mass for obj in objects], dtype=float),
+        "radius": np.array([obj.radius for obj in objects], dtype=np.int32),
+        "color": np.array([obj.color for obj in objects], dtype=np.uint8).reshape(-1, 3),
+    }
+
+
+def saveSnapshot(path: str, objects: list, settings: dict = None):
+    """
+    Writes the given bodies and settings (integrator, dt, substeps, softening, collisions) to path
+    """
+    arrays = arraysFromObjects(objects)
+    for key, value in (settings or {}).items():
+        arrays["setting_" + key] = np.array(value)
+    # savez would add .npz to a path without it, write to the open file so the name is kept
+    with open(path, "wb") as file:
+        np.savez(file, **arrays)
+
+
+def objectsFromArrays(arrays: dict):
+    """
+    Returns the Planets and Attractors described by the packed arrays
+    """
+    # bodies of the same color share one tuple
+    palette, shade = np.unique(arrays["color"].reshape(-1, 3), axis=0, return_inverse=True)
+    palette = [tuple(color) for color in palette.tolist()]
+    colors = [palette[i] for i in shade.ravel().tolist()]
+    columns = [arrays[key].tolist() for key in ("kind", "x", "y", "velx", "vely", "mass", "radius")]
+    attractor = KINDS["A"]
+    # the new bodies hold no cycles, collecting while they are made would only walk over them again and again
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [Attractor(x, y, radius, mass=mass, color=color) if kind == attractor else
+                Planet(x, y, radius, velx=velx, vely=vely, mass=mass, color=color)
+                for kind, x, y, velx, vely, mass, radius, color in zip(*columns, colors)]
+    finally:
+        if (enabled):
+            gc.enable()
+
+
+def loadSnapshot(path: str):
+    """
+    Returns the bodies and the settings stored in the file at path
+    """
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    settings = {key[len("setting_"):]: value.item() for key, value in arrays.items() if key.startswith("setting_")}
+    return objectsFromArrays(arrays), settings
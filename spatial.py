@@ -0,0 +1,95 @@
+from operator import attrgetter
+import numpy as np
+
+# cell of a body whose position is not finite, it is left out of the grid
+NO_CELL = np.iinfo(np.int64).min
+# cells are numbered ix * CELL_SPAN + iy, cell coordinates are kept within +-CELL_LIMIT so the numbers fit
+CELL_SPAN = 1 << 32
+CELL_LIMIT = 1 << 30
+
+
+class SpatialHash:
+    """
+    Uniform grid over the bodies for picking the body under the mouse. Every occupied cell holds the set of the
+    bodies whose center is in it, and a cell is at least as wide as the largest radius, so only the 3x3 cells
+    around a point can hold a body covering it. When the bodies move, only the ones that left their cell are
+    moved in the grid
+    """
+    def __init__(self, cell_size: float = 32):
+        # smallest width of a cell
+        self.cell_size = cell_size
+        self.size = cell_size
+        self.objects = []
+        # registry and version the grid was built for
+        self.key = None
+        # bodies in every occupied cell, and the cell of every body
+        self.cells = {}
+        self.cell = np.zeros(0, dtype=np.int64)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.radius = np.zeros(0)
+
+    def build(self, objects: list, x=None, y=None):
+        """
+        Brings the grid up to date with the given objects (a BodyRegistry or a list) at the positions (x, y),
+        their current positions if not given. The grid is only built from scratch after bodies were added or
+        removed, otherwise the bodies that moved to another cell are moved
+        """
+        n = len(objects)
+        if (x is None):
+            x = np.fromiter(map(attrgetter("x"), objects), float, n)
+            y = np.fromiter(map(attrgetter("y"), objects), float, n)
+        key = (objects, getattr(objects, "version", None))
+        rebuild = self.key is None or key[1] is None or key[0] is not self.key[0] or key[1] != self.key[1]
+        if (rebuild):
+            self.objects = objects if key[1] is not None else list(objects)
+            self.radius = np.fromiter(map(attrgetter("radius"), objects), float, n)
+            self.size = max(self.cell_size, self.radius.max()) if n else self.cell_size
+            self.key = key
+        # the positions are kept, the arrays they come from may change before the next query
+        self.x = np.array(x, dtype=float)
+        self.y = np.array(y, dtype=float)
+        cell = self.cellOf(self.x, self.y)
+        if (rebuild):
+            # sort the bodies by cell and give every cell the run of bodies it holds
+            inside = np.flatnonzero(cell != NO_CELL)
+            order = inside[np.argsort(cell[inside], kind="stable")]
+            numbers, firsts = np.unique(cell[order], return_index=True)
+            self.cells = dict(zip(numbers.tolist(), [set(bodies.tolist()) for bodies in np.split(order, firsts[1:])]))
+        else:
+            moved = np.flatnonzero(cell != self.cell)
+            for i, old, new in zip(moved.tolist(), self.cell[moved].tolist(), cell[moved].tolist()):
+                if (old != NO_CELL):
+                    bodies = self.cells[old]
+                    bodies.discard(i)
+                    if (not bodies):
+                        del self.cells[old]
+                if (new != NO_CELL):
+                    self.cells.setdefault(new, set()).add(i)
+        self.cell = cell
+
+    def cellOf(self, x, y):
+        """
+        Returns the number of the cell holding each point, NO_CELL for points that are not finite
+        """
+        finite = np.isfinite(x) & np.isfinite(y)
+        ix = np.clip(np.floor(np.where(finite, x, 0) / self.size), -CELL_LIMIT, CELL_LIMIT).astype(np.int64)
+        iy = np.clip(np.floor(np.where(finite, y, 0) / self.size), -CELL_LIMIT, CELL_LIMIT).astype(np.int64)
+        return np.where(finite, ix * CELL_SPAN + iy, NO_CELL)
+
+    def query(self, pos: tuple):
+        """
+        Returns the object covering the given position, the first one in the list if several do, None otherwise
+        """
+        if (not self.cells or not np.isfinite(pos[0]) or not np.isfinite(pos[1])):
+            return None
+        center = int(self.cellOf(np.array([pos[0]]), np.array([pos[1]]))[0])
+        candidates = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates.extend(self.cells.get(center + dx * CELL_SPAN + dy, ()))
+        candidates = np.array(candidates, dtype=np.intp)
+        hits = candidates[(pos[0] - self.x[candidates])**2 + (pos[1] - self.y[candidates])**2 <= self.radius[candidates]**2]
+        if (len(hits) == 0):
+            return None
+        return self.objects[hits.min()]
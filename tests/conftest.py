@@ -0,0 +1,10 @@
+import os
+import sys
+# the modules live in the root of the repository, no window is ever opened
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+# the InfoBoxes of the bodies need fonts
+pygame.font.init()
@@ -0,0 +1,28 @@
+import numpy as np
+from barnes_hut import BarnesHutSolver
+from generators import galacticDisk, plummerSphere
+
+
+def test_error_at_default_theta():
+    solver = BarnesHutSolver()
+    for generator in (galacticDisk, plummerSphere):
+        arrays = generator(3000, seed=1)
+        error = solver.findError(arrays["x"], arrays["y"], arrays["mass"])
+        assert error["mean"] < 0.02
+        assert error["rms"] < 0.04
+
+
+def test_lopsided_node_is_opened():
+    # the lower left quarter of the tree holds a heavy body in its corner and a light one next to the target,
+    # so its center of mass is far from the target even though the light body is close
+    x = np.array([1.0, 99.0, 257.0, 150.0])
+    y = np.array([1.0, 99.0, 257.0, 150.0])
+    mass = np.array([10.0, 1.0, 1e-3, 1.0])
+    error = BarnesHutSolver(0.7).findError(x, y, mass, np.array([3]))
+    assert error["max"] < 1e-9
+
+
+def test_theta_zero_is_direct_summation():
+    arrays = plummerSphere(500, seed=2)
+    error = BarnesHutSolver(0.0).findError(arrays["x"], arrays["y"], arrays["mass"])
+    assert error["max"] < 1e-9
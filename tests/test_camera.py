@@ -0,0 +1,49 @@
+import numpy as np
+from camera import FILLED, PIXEL, SMOOTH, Camera, detailOf
+
+
+def test_default_view_is_the_window():
+    camera = Camera((800, 600))
+    assert camera.worldToScreen(123, 45) == (123, 45)
+    assert camera.screenToWorld((123, 45)) == (123, 45)
+
+
+def test_screen_to_world_inverts_world_to_screen():
+    camera = Camera((800, 600))
+    camera.pan(37, -12)
+    camera.zoomAt((250, 80), 3.5)
+    x, y = camera.worldToScreen(np.array([-50.0, 400.0, 1e5]), np.array([20.0, 300.0, -1e5]))
+    for point, world in zip(zip(x, y), ((-50, 20), (400, 300), (1e5, -1e5))):
+        np.testing.assert_allclose(camera.screenToWorld(point), world)
+
+
+def test_zoom_keeps_the_point_under_the_mouse():
+    camera = Camera((800, 600))
+    before = camera.screenToWorld((600, 150))
+    camera.zoomAt((600, 150), 4)
+    np.testing.assert_allclose(camera.screenToWorld((600, 150)), before)
+    assert camera.zoom == 4
+    # the zoom stays within its limits
+    camera.zoomAt((0, 0), 1e6)
+    assert camera.zoom == camera.max_zoom
+
+
+def test_pan_follows_the_mouse():
+    camera = Camera((800, 600))
+    camera.zoomAt((400, 300), 2)
+    before = camera.worldToScreen(100, 100)
+    camera.pan(30, -20)
+    after = camera.worldToScreen(100, 100)
+    assert (after[0] - before[0], after[1] - before[1]) == (30, -20)
+
+
+def test_project_culls_and_picks_the_detail():
+    camera = Camera((800, 600))
+    camera.zoomAt((400, 300), 2)
+    sx, sy, sr, visible = camera.project(np.array([400.0, 10.0, 605.0]), np.array([300.0, 10.0, 300.0]),
+                                         np.array([0.0, 5.0, 10.0]))
+    # the window shows the world from 200 to 600 in x, a body is seen while its disc reaches into it
+    assert visible.tolist() == [True, False, True]
+    assert sr.tolist() == [0, 10, 20]
+    assert [detailOf(r) for r in sr] == [PIXEL, SMOOTH, SMOOTH]
+    assert detailOf(2) == FILLED
@@ -0,0 +1,101 @@
+import numpy as np
+from classes import Attractor, Planet
+from collisions import RELEASE_STEPS, CollisionHandler, sweepAndPrune
+from physics import Engine
+from registry import BodyRegistry
+
+
+def resolve(mode, objects):
+    objects = BodyRegistry(objects)
+    engine = Engine()
+    engine.load(objects)
+    removed = CollisionHandler(mode).resolve(objects, engine)
+    return objects, engine, removed
+
+
+def test_sweep_and_prune_matches_brute_force():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 500, 400)
+    y = rng.uniform(0, 300, 400)
+    radius = rng.integers(1, 6, 400).astype(float)
+    i, j = sweepAndPrune(x, y, radius)
+    touching = (x[:, None] - x)**2 + (y[:, None] - y)**2 <= (radius[:, None] + radius)**2
+    expected = set(zip(*np.nonzero(np.triu(touching, 1))))
+    assert set(zip(np.minimum(i, j).tolist(), np.maximum(i, j).tolist())) == expected
+
+
+def test_sweep_and_prune_finds_wide_and_far_bodies():
+    rng = np.random.default_rng(2)
+    x = rng.uniform(0, 300, 300)
+    y = rng.uniform(0, 300, 300)
+    radius = np.ones(300)
+    # a few bodies much wider than the strips, and one far enough to make the sort key imprecise
+    radius[:3] = (40, 25, 60)
+    y[3] = 1e15
+    i, j = sweepAndPrune(x, y, radius)
+    touching = (x[:, None] - x)**2 + (y[:, None] - y)**2 <= (radius[:, None] + radius)**2
+    expected = set(zip(*np.nonzero(np.triu(touching, 1))))
+    assert set(zip(np.minimum(i, j).tolist(), np.maximum(i, j).tolist())) == expected
+
+
+def test_merge_keeps_mass_and_momentum():
+    light = Planet(100, 100, 3, velx=2, vely=0, mass=1)
+    heavy = Planet(104, 100, 4, velx=-1, vely=1, mass=3)
+    objects, engine, removed = resolve("merge", [light, heavy])
+    # the heavier body survives at the center of mass with the total momentum and area
+    assert removed == [light]
+    assert heavy.mass == 4
+    assert heavy.radius == 5
+    assert engine.x[1] == 103
+    assert (engine.velx[1], engine.vely[1]) == (-0.25, 0.75)
+
+
+def test_merge_into_attractor_keeps_it_in_place():
+    sun = Attractor(400, 300, 20, mass=400)
+    planet = Planet(415, 300, 5, velx=3, mass=50)
+    objects, engine, removed = resolve("merge", [planet, sun])
+    assert removed == [planet]
+    assert sun.mass == 450
+    assert (engine.x[1], engine.y[1]) == (400, 300)
+
+
+def test_bounce_reflects_approaching_bodies():
+    left = Planet(100, 100, 5, velx=1, mass=1)
+    right = Planet(109, 100, 5, velx=-1, mass=1)
+    objects, engine, removed = resolve("bounce", [left, right])
+    assert removed == []
+    # equal masses swap their velocities and are pushed apart until they just touch
+    assert (engine.velx[0], engine.velx[1]) == (-1, 1)
+    assert engine.x[1] - engine.x[0] == 10
+
+
+def test_held_and_ignored_bodies_do_not_collide():
+    first = Planet(100, 100, 5, mass=1)
+    second = Planet(101, 100, 5, mass=1)
+    objects, engine, removed = resolve("ignore", [first, second])
+    assert removed == []
+    objects = BodyRegistry([first, second])
+    objects.hold(second)
+    engine = Engine()
+    engine.load(objects)
+    assert CollisionHandler("merge").resolve(objects, engine) == []
+
+
+def test_bodies_overlapping_at_the_start_pass_through_until_clear():
+    first = Planet(100, 100, 2, mass=1)
+    second = Planet(102, 100, 2, mass=1)
+    third = Planet(200, 100, 2, mass=1)
+    objects = BodyRegistry([first, second, third])
+    engine = Engine()
+    engine.load(objects)
+    collisions = CollisionHandler("merge")
+    collisions.exemptOverlaps(objects)
+    # the crowded bodies do not merge, not even with a body that comes along
+    engine.x[2] = 103
+    assert collisions.resolve(objects, engine) == []
+    engine.x[:] = (100, 150, 200)
+    for step in range(RELEASE_STEPS):
+        assert collisions.resolve(objects, engine) == []
+    # once clear they collide like the others
+    engine.x[:] = (100, 102, 300)
+    assert collisions.resolve(objects, engine) == [second]
@@ -0,0 +1,53 @@
+import numpy as np
+from classes import Attractor, Planet
+from physics import Engine
+from registry import BodyRegistry
+
+
+def makeSystem():
+    return BodyRegistry([Attractor(0, 0, 10, 300), Planet(40, 0, 1, 0, 1.5), Planet(-70, 0, 1, 0, -1.2), Planet(0, 90, 1, 1, 0)])
+
+
+def countedEngine(integrator: str):
+    engine = Engine()
+    engine.setIntegrator(integrator, substeps=2)
+    engine.passes = 0
+    findAccOf = engine.findAccOf
+
+    def counted(bodies):
+        engine.passes += 1
+        findAccOf(bodies)
+    engine.findAccOf = counted
+    return engine
+
+
+def test_block_steps_reuse_the_accelerations():
+    objects, fresh = makeSystem(), makeSystem()
+    engine, forced = countedEngine("block"), countedEngine("block")
+    # forced finds the accelerations at the start of every block step, like before the flag
+    forced.hasAcc = lambda: False
+    for i in range(20):
+        engine.step(objects)
+        forced.step(fresh)
+    assert np.array_equal(engine.x, forced.x) and np.array_equal(engine.vely, forced.vely)
+    assert engine.passes < forced.passes
+    # a change from outside makes the next step find them again
+    engine.changed()
+    passes = engine.passes
+    engine.advance()
+    forced_passes = forced.passes
+    forced.advance()
+    assert engine.passes - passes == forced.passes - forced_passes - 1
+
+
+def test_leapfrog_steps_reuse_the_accelerations():
+    objects, fresh = makeSystem(), makeSystem()
+    engine, forced = countedEngine("leapfrog"), countedEngine("leapfrog")
+    forced.hasAcc = lambda: False
+    for i in range(20):
+        engine.step(objects)
+        forced.step(fresh)
+    assert np.array_equal(engine.x, forced.x) and np.array_equal(engine.vely, forced.vely)
+    # one pass per substep, and the leading pass of the first step
+    assert engine.passes == 2 * 20 + 1
+    assert forced.passes == 3 * 20
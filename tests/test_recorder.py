@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from classes import Attractor, Planet
+from physics import Engine
+from recorder import TrajectoryReader, TrajectoryRecorder
+from registry import BodyRegistry
+from snapshot import KINDS
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.bin")
+    objects = BodyRegistry([Attractor(400, 300, 20, mass=400), Planet(400, 500, 7, velx=1.5, mass=10)])
+    engine = Engine()
+    engine.load(objects)
+    recorder = TrajectoryRecorder(path)
+    recorder.record(objects, engine)
+    engine.x[1] += 2.5
+    recorder.record(objects, engine)
+    objects.remove(objects[0])
+    engine.load(objects)
+    recorder.record(objects, engine)
+    recorder.close()
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == 3
+    assert reader.keyframeOf(0) == reader.keyframeOf(1) != reader.keyframeOf(2)
+    bodies = reader.bodies(1)
+    assert bodies["kind"].tolist() == [KINDS["A"], KINDS["P"]]
+    assert bodies["radius"].tolist() == [20, 7]
+    assert bodies["mass"].tolist() == [400, 10]
+    np.testing.assert_allclose(reader.frame(1), [[400, 300, 0, 0], [402.5, 500, 1.5, 0]])
+    np.testing.assert_allclose(reader.frame(2), [[400, 500, 1.5, 0]])
+
+
+def test_dead_writer_raises(tmp_path):
+    recorder = TrajectoryRecorder(str(tmp_path / "run.bin"), queue_size=1)
+    # the background thread fails on the first record it writes
+    recorder.data.close()
+    recorder.recordFrame(np.zeros(2), np.zeros(2), np.zeros(2), np.zeros(2))
+    recorder.thread.join(5)
+    with pytest.raises(RuntimeError):
+        recorder.recordFrame(np.zeros(2), np.zeros(2), np.zeros(2), np.zeros(2))
+    with pytest.raises(RuntimeError):
+        recorder.close()
+
+
+def test_replay_keeps_trails_of_the_shown_bodies(tmp_path):
+    from game_file import Game
+    path = str(tmp_path / "run.bin")
+    objects = BodyRegistry([Planet(100 + 30 * i, 100, 5, vely=1, mass=1) for i in range(5)])
+    engine = Engine()
+    engine.load(objects)
+    recorder = TrajectoryRecorder(path)
+    # the bodies merge one by one, every record after a merge starts a keyframe
+    while (len(objects) > 1):
+        recorder.record(objects, engine)
+        objects.remove(objects[-1])
+        engine.load(objects)
+    recorder.record(objects, engine)
+    recorder.close()
+
+    reader = TrajectoryReader(path)
+    game = Game(None)
+    game.replay_reader = reader
+    game.replay_keyframe = None
+    game.replay_position = 0.0
+    game.replay_shown = -1
+    game.paused = True
+    game.replay_seek = (len(reader) - 1) / game.physics_rate
+    game.stepReplay(0)
+    assert len(game.objects) == 1
+    assert len(game.trails.rows) == 1
+    assert game.trails.count[game.trails.rowOf(game.objects[0])] == 1
@@ -0,0 +1,68 @@
+from classes import Attractor, Planet
+from registry import BodyRegistry
+
+
+def makeRegistry():
+    return BodyRegistry([Attractor(0, 0, 5), Planet(1, 0, 1), Planet(2, 0, 1), Attractor(3, 0, 5), Planet(4, 0, 1)])
+
+
+def test_swap_remove_moves_the_last_body():
+    objects = makeRegistry()
+    first, last = objects[1], objects[4]
+    version = objects.version
+    objects.remove(first)
+    assert len(objects) == 4
+    assert objects[1] is last
+    assert objects.indexOf(last) == 1
+    assert first not in objects and first.handle is None
+    assert objects.version > version
+
+
+def test_handles_stay_valid():
+    objects = makeRegistry()
+    handles = [obj.handle for obj in objects]
+    removed = objects[0]
+    objects.remove(removed)
+    assert objects.get(handles[0]) is None
+    for handle in handles[1:]:
+        assert objects.get(handle).handle == handle
+    # handles are never given out again
+    added = Planet(5, 0, 1)
+    assert objects.add(added) not in handles
+
+
+def test_indices_follow_the_swap():
+    objects = makeRegistry()
+    objects.remove(objects[0])
+    # the planet from the end took the slot of the attractor
+    assert objects.staticIndices().tolist() == [3]
+    assert objects.dynamicIndices().tolist() == [0, 1, 2]
+    objects.remove(objects[3])
+    assert objects.staticIndices().tolist() == []
+    assert [obj.x for obj in objects] == [4, 1, 2]
+
+
+def test_held_bodies_do_not_move():
+    objects = makeRegistry()
+    planet = objects[4]
+    objects.hold(planet)
+    assert objects.movingIndices().tolist() == [1, 2]
+    # the held body keeps being held after it was swapped into another slot
+    objects.remove(objects[1])
+    assert objects.indexOf(planet) == 1
+    assert objects.movingIndices().tolist() == [2]
+    objects.release(planet)
+    assert objects.movingIndices().tolist() == [1, 2]
+
+
+def test_engine_removes_bodies_like_the_registry():
+    from physics import Engine
+    objects = makeRegistry()
+    engine = Engine()
+    engine.load(objects)
+    engine.x += 10
+    engine.remove(objects, [objects[1], objects[0]])
+    # the arrays follow the swaps without being loaded again, so they keep their newer state
+    assert engine.holds(objects)
+    assert engine.x.tolist() == [13, 14, 12]
+    assert engine.dynamic.tolist() == objects.movingIndices().tolist() == [1, 2]
@@ -0,0 +1,42 @@
+import numpy as np
+from classes import Attractor, Planet
+from snapshot import arraysFromObjects, loadSnapshot, objectsFromArrays, saveSnapshot
+
+SETTINGS = {"integrator": "leapfrog", "dt": 0.5, "substeps": 4, "softening": 2.0, "collisions": "bounce"}
+
+
+def makeObjects():
+    return [Attractor(400, 300, 20, mass=400, color=(255, 255, 0)),
+            Planet(400.5, 500.25, 7, velx=1.5, vely=-0.25, mass=10, color=(0, 0, 255)),
+            Planet(400, 515, 3, velx=2.0, mass=0.1, color=(0, 255, 0))]
+
+
+def describe(objects):
+    return [(obj.getType(), obj.x, obj.y, getattr(obj, "velx", 0), getattr(obj, "vely", 0), obj.mass, obj.radius,
+             tuple(obj.color)) for obj in objects]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "scene.npz")
+    objects = makeObjects()
+    saveSnapshot(path, objects, SETTINGS)
+    loaded, settings = loadSnapshot(path)
+    assert describe(loaded) == describe(objects)
+    assert settings == SETTINGS
+
+
+def test_arrays_round_trip():
+    objects = makeObjects()
+    arrays = arraysFromObjects(objects)
+    assert arrays["kind"].tolist() == [0, 1, 1]
+    assert arrays["color"].shape == (3, 3)
+    np.testing.assert_array_equal(arraysFromObjects(objectsFromArrays(arrays))["x"], arrays["x"])
+    assert describe(objectsFromArrays(arrays)) == describe(objects)
+
+
+def test_empty_scene(tmp_path):
+    path = str(tmp_path / "empty.npz")
+    saveSnapshot(path, [])
+    loaded, settings = loadSnapshot(path)
+    assert loaded == []
+    assert settings == {}
@@ -0,0 +1,57 @@
+import numpy as np
+from classes import Attractor, Planet
+from registry import BodyRegistry
+from spatial import SpatialHash
+
+
+def makeObjects():
+    return BodyRegistry([Attractor(400, 300, 20), Planet(100, 100, 5), Planet(105, 100, 5), Planet(1e7, -1e7, 5)])
+
+
+def test_query():
+    objects = makeObjects()
+    grid = SpatialHash()
+    grid.build(objects)
+    assert grid.query((410, 310)) is objects[0]
+    # overlapping bodies give the first one
+    assert grid.query((103, 100)) is objects[1]
+    assert grid.query((1e7 + 1, -1e7)) is objects[3]
+    assert grid.query((250, 200)) is None
+
+
+def test_only_moved_bodies_change_cell():
+    objects = makeObjects()
+    grid = SpatialHash()
+    grid.build(objects)
+    cells = dict(grid.cells)
+    objects[1].x = 500
+    objects[2].x = 106
+    grid.build(objects)
+    assert grid.query((500, 100)) is objects[1]
+    assert grid.query((102, 100)) is objects[2]
+    # the cell of the attractor was left alone
+    assert grid.cells[grid.cell[0]] is cells[grid.cell[0]]
+
+
+def test_rebuilt_after_removal():
+    objects = makeObjects()
+    grid = SpatialHash()
+    grid.build(objects)
+    objects.remove(objects[0])
+    grid.build(objects)
+    assert grid.query((400, 300)) is None
+    assert grid.query((1e7, -1e7)) is objects[0]
+
+
+def test_non_finite_positions_are_skipped():
+    objects = makeObjects()
+    objects[1].x = np.nan
+    objects[2].y = np.inf
+    grid = SpatialHash()
+    grid.build(objects)
+    assert grid.query((100, 100)) is None
+    assert grid.query((400, 300)) is objects[0]
+    assert grid.query((np.nan, 0)) is None
+    objects[1].x = 100
+    grid.build(objects)
+    assert grid.query((100, 100)) is objects[1]
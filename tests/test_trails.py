@@ -0,0 +1,28 @@
+import numpy as np
+from camera import Camera
+from classes import Planet
+from trails import PIXEL_LIMIT, TrailBuffer
+
+
+def test_points_are_rounded_after_the_camera():
+    trails = TrailBuffer(length=4)
+    planet = Planet(0, 0, 1)
+    for x in (100.0, 100.25, 100.5):
+        trails.push([planet], np.array([x]), np.array([200.0]))
+    camera = Camera((800, 600))
+    camera.zoomAt((100, 200), 8)
+    # a quarter of a world unit is two pixels at zoom 8
+    screen = trails.toScreen(trails.points[trails.rowOf(planet), :3], camera)
+    assert screen[:, 0].tolist() == [100, 102, 104]
+    assert screen[:, 1].tolist() == [200, 200, 200]
+
+
+def test_far_points_do_not_overflow():
+    trails = TrailBuffer(length=4)
+    planet = Planet(0, 0, 1)
+    for x in (0.0, 1e12):
+        trails.push([planet], np.array([x]), np.array([-1e12]))
+    rect = trails.findRects()[0]
+    assert rect[0] == -trails.width
+    assert rect[1] == -PIXEL_LIMIT - trails.width
+    assert rect[2] > 0 and rect[3] > 0
@@ -0,0 +1,214 @@
+import numpy as np
+import pygame
+
+# number of past positions kept for every planet
+TRAIL_LENGTH = 158
+# brightness of the newest point of a trail, every older point is one darker
+TRAIL_BRIGHTNESS = 159
+# window coordinates are clipped to this many pixels off the window, far points keep their direction
+PIXEL_LIMIT = 1 << 24
+
+
+def toPixels(values):
+    """
+    Returns the given window coordinates rounded to the nearest pixel as int32
+    """
+    return np.clip(np.rint(values), -PIXEL_LIMIT, PIXEL_LIMIT).astype(np.int32)
+
+
+class TrailBuffer:
+    """
+    Stores the trails of every planet in one preallocated ring buffer. All trails share the same write position,
+    so pushing a frame is a single array write and the age (and fade) of a point follows from its index
+    """
+    def __init__(self, length: int = TRAIL_LENGTH, bands: int = 10, width: int = 3):
+        self.length = length
+        # a trail is drawn as this many polylines of one color each instead of one line per point
+        self.bands = bands
+        self.width = width
+        # points[row, i] is a past world position, rows are given out to planets. They are only rounded
+        # to pixels once they are in the window, so zoomed in trails stay smooth
+        self.points = np.zeros((0, length, 2), dtype=np.float32)
+        # number of valid points in every row
+        self.count = np.zeros(0, dtype=np.intp)
+        # index the next frame is written to
+        self.head = 0
+        # changes every time the trails change
+        self.version = 0
+        # row of every planet and rows that can be given out again
+        self.rows = {}
+        self.free = []
+        # list of planets last pushed and their rows, reused while the same list is pushed again
+        self.pushed = (None, None)
+
+    def rowOf(self, obj: object):
+        """
+        Returns the row of the given planet, giving it an empty one if it has none
+        """
+        row = self.rows.get(obj)
+        if (row is None):
+            if (not self.free):
+                # double the number of rows
+                old = len(self.count)
+                grown = max(2 * old, 64)
+                self.points = np.concatenate((self.points, np.zeros((grown - old, self.length, 2), dtype=np.float32)))
+                self.count = np.concatenate((self.count, np.zeros(grown - old, dtype=np.intp)))
+                self.free = list(range(grown - 1, old - 1, -1))
+            row = self.free.pop()
+            self.count[row] = 0
+            self.rows[obj] = row
+        return row
+
+    def remove(self, obj: object):
+        """
+        Frees the row of the given planet
+        """
+        row = self.rows.pop(obj, None)
+        if (row is not None):
+            self.free.append(row)
+            self.pushed = (None, None)
+
+    def clear(self):
+        """
+        Empties every trail
+        """
+        if (self.count.any()):
+            self.count[:] = 0
+            self.version += 1
+
+    def push(self, planets: list, x, y):
+        """
+        Adds the positions (x[i], y[i]) to the trail of planets[i]. Pushing the same list again skips looking up
+        the rows, so the list must not be changed in between
+        """
+        if (planets is self.pushed[0]):
+            rows = self.pushed[1]
+        else:
+            rows = np.array([self.rowOf(obj) for obj in planets], dtype=np.intp)
+            self.pushed = (planets, rows)
+        self.points[rows, self.head, 0] = x
+        self.points[rows, self.head, 1] = y
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.length)
+        self.head = (self.head + 1) % self.length
+        self.version += 1
+
+    def findRects(self, camera: object = None):
+        """
+        Returns the (x, y, width, height) of the area covered by every trail in the window,
+        seen through the given Camera if there is one
+        """
+        rows = np.array([row for row in self.rows.values() if self.count[row] >= 2], dtype=np.intp)
+        if (len(rows) == 0):
+            return []
+        ages = (self.head - 1 - np.arange(self.length)) % self.length
+        points = self.points[rows][:, ages]
+        # ignore the slots that were not written yet by repeating the oldest valid point
+        valid = np.arange(self.length)[np.newaxis, :] < self.count[rows, np.newaxis]
+        oldest = points[np.arange(len(rows)), self.count[rows] - 1]
+        points = np.where(valid[:, :, np.newaxis], points, oldest[:, np.newaxis, :])
+        points = self.toScreen(points, camera)
+        # lines are drawn width pixels wide around the points
+        low = points.min(axis=1) - self.width
+        high = points.max(axis=1) + self.width
+        return [(int(l[0]), int(l[1]), int(h[0] - l[0] + 1), int(h[1] - l[1] + 1)) for l, h in zip(low, high)]
+
+    def toScreen(self, points, camera: object = None):
+        """
+        Returns the given world points as the window pixels the given Camera shows them at,
+        the world is the window if there is no camera
+        """
+        if (camera):
+            points = np.stack(camera.worldToScreen(points[..., 0].astype(float), points[..., 1].astype(float)), axis=-1)
+        return toPixels(points)
+
+    def display(self, win, camera: object = None):
+        """
+        Draws every trail, fading from the newest point to the oldest in bands of equal color,
+        seen through the given Camera if there is one
+        """
+        band_size = -(-self.length // self.bands)
+        # index of the point of every age, newest first
+        ages = (self.head - 1 - np.arange(self.length)) % self.length
+        for row in self.rows.values():
+            count = self.count[row]
+            if (count < 2):
+                continue
+            trail = self.points[row, ages[:count]]
+            trail = self.toScreen(trail, camera).tolist()
+            for start in range(0, count - 1, band_size):
+                brightness = TRAIL_BRIGHTNESS - start
+                # bands share their end point so the trail has no gaps
+                pygame.draw.lines(win, (brightness, brightness, brightness), False, trail[start:start + band_size + 1], self.width)
+
+
+class FadingTrailLayer:
+    """
+    Draws trails into an off-screen surface instead of storing past positions. Every frame the whole surface
+    is darkened by a constant in one blend, and only the newest segment of every planet is drawn on it,
+    so the cost per frame only grows with the number of planets and the memory never grows.
+    The segments are drawn where the given Camera shows them, the layer starts over when the camera moves
+    """
+    def __init__(self, size: tuple = (1000, 600), fade: int = 1, width: int = 3, camera: object = None):
+        self.surface = pygame.Surface(size)
+        self.camera = camera
+        # version of the camera the layer was drawn with
+        self.camera_version = camera.version if camera else None
+        # brightness taken away every frame, the default fades the newest segment out in TRAIL_BRIGHTNESS frames
+        self.fade = fade
+        self.width = width
+        # last position of every planet, the start of its next segment
+        self.last = {}
+        # changes every time the layer changes
+        self.version = 0
+        # whether anything was drawn since the layer was last cleared
+        self.drawn = False
+
+    def remove(self, obj: object):
+        """
+        Forgets the last position of the given planet, what is already drawn fades out by itself
+        """
+        self.last.pop(obj, None)
+
+    def clear(self):
+        """
+        Empties the layer
+        """
+        self.last = {}
+        if (self.drawn):
+            self.surface.fill((0, 0, 0))
+            self.drawn = False
+            self.version += 1
+
+    def push(self, planets: list, x, y):
+        """
+        Fades the layer and draws the segment from the last position of planets[i] to (x[i], y[i])
+        """
+        if (self.camera):
+            # the old segments are in the wrong place once the view moved
+            if (self.camera.version != self.camera_version):
+                self.clear()
+                self.camera_version = self.camera.version
+            x, y = self.camera.worldToScreen(np.asarray(x), np.asarray(y))
+        self.surface.fill((self.fade, self.fade, self.fade), special_flags=pygame.BLEND_SUB)
+        color = (TRAIL_BRIGHTNESS, TRAIL_BRIGHTNESS, TRAIL_BRIGHTNESS)
+        for obj, px, py in zip(planets, toPixels(x).tolist(), toPixels(y).tolist()):
+            last = self.last.get(obj)
+            if (last):
+                pygame.draw.line(self.surface, color, last, (px, py), self.width)
+            self.last[obj] = (px, py)
+        self.drawn = True
+        self.version += 1
+
+    def findRects(self, camera: object = None):
+        """
+        Returns the area covered by the layer, all of it once something was drawn
+        """
+        return [tuple(self.surface.get_rect())] if self.drawn else []
+
+    def display(self, win, camera: object = None):
+        """
+        Draws the layer onto the window, it has to be drawn before the bodies.
+        The layer is already drawn as its own camera sees it
+        """
+        if (self.drawn):
+            win.blit(self.surface, (0, 0), special_flags=pygame.BLEND_ADD)
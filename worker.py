@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from snapshot import KINDS
+
+
+class PhysicsWorker:
+    """
+    Steps the physics on a background thread at a fixed rate, so a slow step never holds up input or drawing.
+    The worker owns its arrays: the game changes them only by sending commands, which are queued in a deque
+    and carry copies of the values they set. After every step the worker publishes a snapshot of the bodies,
+    and the two newest snapshots are swapped in together so the game always reads a matching pair to
+    interpolate between
+    """
+    def __init__(self, engine: object, collisions: object, rate: float = 60):
+        # the engine and collision handler must not be used by anything else while the worker runs
+        self.engine = engine
+        self.collisions = collisions
+        # steps per second
+        self.rate = rate
+        self.commands = deque()
+        # the snapshot before the newest one and the newest one
+        self.snapshots = (None, None)
+        self.paused = False
+        # recorder every step is written to, None when not recording
+        self.recorder = None
+        self.recorded_epoch = None
+        # counts the steps, the body sets (epochs) and the "load" commands
+        self.steps = 0
+        self.epoch = 0
+        self.loads = 0
+        self.running = False
+        self.thread = None
+        self.load({"kind": np.zeros(0, dtype=np.uint8), "x": np.zeros(0), "y": np.zeros(0), "velx": np.zeros(0),
+                   "vely": np.zeros(0), "mass": np.zeros(0), "radius": np.zeros(0), "color": np.zeros((0, 3), dtype=np.uint8)},
+                  np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool))
+        # the empty start above does not count as a load sent by the game
+        self.loads = 0
+
+    def start(self):
+        """
+        Starts stepping on the background thread
+        """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the background thread after its current step
+        """
+        self.running = False
+        if (self.thread):
+            self.thread.join()
+            self.thread = None
+
+    def send(self, *command):
+        """
+        Queues a command for the worker, it is done before the next step
+        """
+        self.commands.append(command)
+
+    def load(self, arrays: dict, handles, held):
+        """
+        Replaces every body with the ones in the packed arrays (see snapshot.arraysFromObjects)
+        """
+        engine = self.engine
+        engine.x = np.array(arrays["x"], dtype=float)
+        engine.y = np.array(arrays["y"], dtype=float)
+        engine.velx = np.array(arrays["velx"], dtype=float)
+        engine.vely = np.array(arrays["vely"], dtype=float)
+        engine.mass = np.array(arrays["mass"], dtype=float)
+        engine.accx = np.zeros(len(engine.x))
+        engine.accy = np.zeros(len(engine.x))
+        engine.changed()
+        self.radius = np.array(arrays["radius"], dtype=float)
+        self.static = np.asarray(arrays["kind"]) != KINDS["P"]
+        self.color = np.array(arrays["color"], dtype=np.uint8).reshape(-1, 3)
+        self.handles = np.array(handles, dtype=np.int64)
+        self.held = np.array(held, dtype=bool)
+        self.loads += 1
+        self.newEpoch()
+
+    def newEpoch(self):
+        """
+        Notes that the set of bodies changed
+        """
+        self.index = {handle: i for i, handle in enumerate(self.handles.tolist())}
+        self.engine.dynamic = np.flatnonzero(~self.static & ~self.held)
+        self.epoch += 1
+
+    def applyCommands(self):
+        """
+        Does every queued command, returns True if there were any
+        """
+        applied = False
+        while (self.commands):
+            command = self.commands.popleft()
+            name = command[0]
+            applied = True
+            if (name == "load"):
+                self.load(*command[1:])
+            elif (name == "set"):
+                # new state of one body: handle, x, y, velx, vely, mass, color
+                i = self.index.get(command[1])
+                if (i is not None):
+                    engine = self.engine
+                    engine.x[i], engine.y[i], engine.velx[i], engine.vely[i], engine.mass[i] = command[2:7]
+                    engine.changed()
+                    self.color[i] = command[7]
+            elif (name == "hold"):
+                i = self.index.get(command[1])
+                if (i is not None):
+                    self.held[i] = command[2]
+                    self.engine.dynamic = np.flatnonzero(~self.static & ~self.held)
+            elif (name == "pause"):
+                self.paused = command[1]
+            elif (name == "settings"):
+                integrator, dt, substeps, softening, collisions = command[1:]
+                self.engine.setIntegrator(integrator, dt=dt, substeps=substeps)
+                self.engine.softening = softening
+                self.collisions.setMode(collisions)
+            elif (name == "record"):
+                # the worker closes the recorder it stops using, nothing else writes to it
+                if (self.recorder and self.recorder is not command[1]):
+                    self.recorder.close()
+                self.recorder = command[1]
+                self.recorded_epoch = None
+        return applied
+
+    def step(self):
+        """
+        Advances the bodies by one step and resolves their collisions
+        """
+        engine = self.engine
+        engine.advance()
+        removed, changed = self.collisions.resolveArrays(engine, self.radius, self.static, self.held, self.handles)
+        if (len(removed)):
+            keep = np.ones(len(self.handles), dtype=bool)
+            keep[removed] = False
+            for name in ("x", "y", "velx", "vely", "accx", "accy", "mass"):
+                setattr(engine, name, getattr(engine, name)[keep])
+            for name in ("radius", "static", "color", "handles", "held"):
+                setattr(self, name, getattr(self, name)[keep])
+            self.newEpoch()
+        self.steps += 1
+        if (self.recorder):
+            if (self.recorded_epoch != self.epoch):
+                self.recorder.recordKeyframe(np.where(self.static, KINDS["A"], KINDS["P"]), self.color, self.radius, engine.mass)
+                self.recorded_epoch = self.epoch
+            self.recorder.recordFrame(engine.x, engine.y, engine.velx, engine.vely)
+
+    def publish(self, moved: bool):
+        """
+        Publishes the current state as the newest snapshot. When the bodies did not move (only commands changed them)
+        the snapshot replaces both old ones, so nothing is interpolated towards a state the bodies never had
+        """
+        engine = self.engine
+        previous = self.snapshots[1]
+        snapshot = {"step": self.steps, "time": time.perf_counter(), "epoch": self.epoch, "loads": self.loads,
+                    "x": engine.x.copy(), "y": engine.y.copy(), "velx": engine.velx.copy(), "vely": engine.vely.copy()}
+        # the bodies only change on a new epoch, the arrays that describe them are shared until then
+        if (previous and previous["epoch"] == self.epoch):
+            for name in ("handles", "mass", "radius"):
+                snapshot[name] = previous[name]
+        else:
+            snapshot["handles"] = self.handles.copy()
+            snapshot["mass"] = engine.mass.copy()
+            snapshot["radius"] = self.radius.copy()
+        self.snapshots = (previous if moved and previous else snapshot, snapshot)
+
+    def run(self):
+        """
+        Steps at the fixed rate until stop is called, runs on the background thread
+        """
+        next_time = time.perf_counter()
+        while (self.running):
+            changed = self.applyCommands()
+            if (not self.paused and len(self.handles)):
+                self.step()
+                self.publish(True)
+            elif (changed or self.snapshots[1] is None):
+                self.publish(False)
+            next_time += 1 / self.rate
+            delay = next_time - time.perf_counter()
+            if (delay > 0):
+                time.sleep(delay)
+            elif (delay < -0.25):
+                # a step took much longer than its share of real time, do not try to catch up
+                next_time = time.perf_counter()